@@ -1,354 +1,331 @@
 import streamlit as st
-import requests
-import json
-import os
 import openai
 from datetime import datetime
-from gtts import gTTS
-import tempfile
-import speech_recognition as sr
 import streamlit.components.v1 as components
-from jinja2 import Template
-import pygame
 import threading
 import time
-import re
 
 # Set up the page layout and appearance.
 st.set_page_config(layout="wide")
 
 # Prepare API keys and other configurations needed for communicating with external services.
-from config import OPENAI_API_KEY, NEWSAPI_KEY
+from config import OPENAI_API_KEY
+from summarizer import get_prompt_variant
+from bundles import categories_bundle_name, load_bundle, user_bundle_name
+from edition import Edition, ProgressiveBuild, build_edition, edition_snapshot_path, order_categories
+from feedback_store import get_feedback_store
+from profiles import get_profile_store
+from renderer import render_newspaper
+from intent_parser import FAST_PATH_MIN_CONFIDENCE, IntentRecognizer, interpret_user_intent, parse_intent
+from voice_input import create_voice_session
+from playback import get_playback_engine
+from metrics import increment, start_metrics_server
+from tts import (
+    ACKNOWLEDGMENT_PROMPT, CHOOSE_CATEGORY_PROMPT, FAREWELL_PROMPT, INVALID_HEADLINE_PROMPT,
+    MENTION_HEADLINE_PROMPT, NO_INPUT_PROMPT, UNKNOWN_CATEGORY_PROMPT, WHICH_HEADLINE_PROMPT,
+    get_audio_cache, greeting_text, headlines_announcement, precompute_prompts,
+    stream_speech, summary_announcement
+)
 openai.api_key = OPENAI_API_KEY
 
 # Define some variables that we’ll use throughout the program.
-PREFERENCES_FILE = 'preferences.json'
-FEEDBACK_FILE = 'feedback.json'
+NEW_READER = "➕ New reader"
+# Show headlines first and fill in summaries as they stream in, redrawing at most
+# every PROGRESSIVE_RENDER_INTERVAL seconds.
+PROGRESSIVE_RENDERING = True
+PROGRESSIVE_RENDER_INTERVAL = 0.5
+# Speech recognizer backend ('google' or 'sphinx'). Set VOICE_INPUT_FILES to a list of
+# WAV files to replay them instead of using the microphone ('transcript' backend reads
+# the text from a .txt file next to each WAV).
+VOICE_RECOGNIZER_BACKEND = 'google'
+VOICE_INPUT_FILES = None
+# Listen while the anchor reads summaries and articles, and cut it off when the reader
+# gives a clear command. Off by default: there is no echo cancellation, so without
+# headphones the microphone also hears the anchor.
+BARGE_IN = False
+BARGE_IN_LISTEN_TIMEOUT = 1
+# Commands that may interrupt the anchor; anything else heard while it talks is ignored.
+BARGE_IN_ACTIONS = ('exit', 'select_category', 'select_headline')
 NEWS_CATEGORIES = [
     'Business', 'Entertainment', 'General', 'Health', 'Science', 'Sports', 'Technology'
 ]
 
-# Initialize Pygame’s mixer so we can play audio.
-pygame.mixer.init()
+# Synthesize the fixed assistant phrases once per process, in the background.
+@st.cache_resource
+def warm_prompt_audio():
+    thread = threading.Thread(target=precompute_prompts, daemon=True)
+    thread.start()
+    return thread
+
+warm_prompt_audio()
+
+# Serve pipeline metrics for Prometheus at http://127.0.0.1:9464/metrics.
+@st.cache_resource
+def metrics_endpoint():
+    return start_metrics_server()
+
+metrics_endpoint()
 
 # Below are various helper functions for tasks like loading/saving preferences, 
 # retrieving feedback, calling APIs for news articles, and generating audio summaries.
 
-def load_preferences():
+def load_preferences(user_id):
     # Load the user’s saved preferences, if they exist.
-    if os.path.exists(PREFERENCES_FILE):
-        with open(PREFERENCES_FILE, 'r') as f:
-            return json.load(f)
-    return None
+    return get_profile_store().get(user_id)
 
 def save_preferences(preferences):
-    # Save the user’s preferences to a file for future use.
-    with open(PREFERENCES_FILE, 'w') as f:
-        json.dump(preferences, f)
-
-def load_feedback():
-    # Load any feedback previously given by the user.
-    if os.path.exists(FEEDBACK_FILE):
-        with open(FEEDBACK_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_feedback(feedback_list):
-    # Save the updated feedback list back to the file.
-    with open(FEEDBACK_FILE, 'w') as f:
-        json.dump(feedback_list, f)
+    # Save the user’s preferences to their profile; returns the profile with its id.
+    return get_profile_store().save(preferences)
 
 def store_feedback(feedback, preferences):
     # Record new feedback along with the user’s chosen categories.
-    feedback_list = load_feedback()
-    feedback_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'feedback': feedback,
-        'preferences': preferences.get('categories', [])
-    }
-    feedback_list.append(feedback_entry)
-    save_feedback(feedback_list)
+    # The entry is appended to the log and the category aggregates are updated in one transaction.
+    feedback_entry = get_feedback_store().record(
+        feedback, preferences.get('categories', []), preferences['id']
+    )
     print(f"Feedback stored: {feedback_entry}")
 
-def analyze_feedback():
+def analyze_feedback(user_id, window=None):
     # Evaluate past feedback to see which categories got positive or negative reactions.
-    feedback_list = load_feedback()
-    category_feedback = {}
-    for entry in feedback_list:
-        feedback_value = 1 if entry['feedback'] == 'positive' else -1
-        for category in entry['preferences']:
-            if category not in category_feedback:
-                category_feedback[category] = {'score': 0, 'count': 0}
-            category_feedback[category]['score'] += feedback_value
-            category_feedback[category]['count'] += 1
-    return category_feedback
-
-def get_news_articles(categories, articles_per_category=5):
-    # Fetch top news headlines from the specified categories using the NewsAPI.
-    all_articles = []
-    for category in categories:
-        url = (
-            f'https://newsapi.org/v2/top-headlines?'
-            f'category={category.lower()}&'
-            f'language=en&'
-            f'pageSize={articles_per_category}&'
-            f'apiKey={NEWSAPI_KEY}'
-        )
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            for article in data['articles']:
-                article['category'] = category
-                all_articles.append(article)
-    return all_articles
-
-def adjust_prompt_based_on_feedback(base_prompt, feedback_analysis):
-    # Tune the prompt for the language model based on user feedback trends.
-    overall_score = sum([cat['score'] for cat in feedback_analysis.values()])
-    if overall_score < 0:
-        # If feedback is generally negative, make summaries shorter and simpler.
-        adjusted_prompt = base_prompt + "\nPlease make the summary concise and easy to understand."
-    elif overall_score > 0:
-        # If feedback is positive, allow more detailed summaries.
-        adjusted_prompt = base_prompt + "\nFeel free to include important details."
-    else:
-        # If it’s neutral, just use the base prompt.
-        adjusted_prompt = base_prompt
-    return adjusted_prompt
-
-def summarize_articles(articles, feedback_analysis):
-    # Use the language model to summarize each article’s content.
-    summaries = []
-    for article in articles:
-        content = article.get('content') or article.get('description') or ''
-        if content:
-            base_prompt = (
-                f"Summarize the following article in 150 words:\n"
-                f"Title: {article['title']}\nContent: {content}"
-            )
-            adjusted_prompt = adjust_prompt_based_on_feedback(base_prompt, feedback_analysis)
-            try:
-                response = openai.ChatCompletion.create(
-                    model='gpt-3.5-turbo',
-                    messages=[{"role": "user", "content": adjusted_prompt}],
-                    max_tokens=300,
-                    temperature=0,
-                    request_timeout=10
-                )
-                summary = response.choices[0].message['content'].strip()
-                article_full_text = content
-            except Exception as e:
-                print(f"Error summarizing article: {e}")
-                summary = "Summary not available."
-                article_full_text = content
-        else:
-            # In case the article has no content to summarize.
-            print(f"No content available for article: {article['title']}")
-            summary = "Summary not available."
-            article_full_text = "Full text not available."
-        summaries.append({
-            'title': article['title'],
-            'summary': summary,
-            'full_text': article_full_text,
-            'url': article['url'],
-            'image': article.get('urlToImage'),
-            'category': article.get('category', 'General')
-        })
-    return summaries
+    # Reads the precomputed aggregates; pass a window name for time-decayed scores.
+    store = get_feedback_store()
+    if window is None:
+        return store.totals(user_id)
+    return store.decayed(window, user_id)
 
 def generate_news_anchor_audio(text):
     # Convert text into a short audio segment. Keep it brief to avoid long processing times.
+    # Audio is cached on disk by content, so repeated phrases are not synthesized again.
     max_length = 500
     text = text[:max_length]
-    tts = gTTS(text=text, lang='en', slow=False)
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp:
-        tts.save(tmp.name)
-        return tmp.name
-
-def generate_news_anchor_audio_chunks(text, chunk_size=500):
-    # Break longer text into smaller chunks so it can be processed easily by TTS.
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    audio_files = []
-    for idx, chunk in enumerate(chunks):
-        tts = gTTS(text=chunk, lang='en', slow=False)
-        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'_{idx}.mp3')
-        tts.save(tmp_file.name)
-        audio_files.append(tmp_file.name)
-    return audio_files
+    return get_audio_cache().synthesize(text)
+
+def speak_long_text(text, interrupt_event):
+    # Read longer text aloud, synthesizing the next chunk while the current one plays.
+    stream_speech(text, get_playback_engine().enqueue, interrupt_event)
+
+def is_barge_in_command(user_input, categories):
+    # Only a confidently parsed command may interrupt; stray speech, including the
+    # anchor's own voice picked up by the microphone, never does.
+    intent, confidence = parse_intent(user_input, categories)
+    return intent['action'] in BARGE_IN_ACTIONS and confidence >= FAST_PATH_MIN_CONFIDENCE
+
+def speak_interruptibly(text, categories):
+    # Read text aloud while listening for the reader. A command stops the anchor and
+    # is returned so it can be handled as the next turn.
+    interrupt_event = threading.Event()
+    speaker = threading.Thread(target=speak_long_text, args=(text, interrupt_event), daemon=True)
+    speaker.start()
+    command = None
+    while BARGE_IN and speaker.is_alive():
+        try:
+            heard = get_voice_session().listen(BARGE_IN_LISTEN_TIMEOUT)
+        except Exception as e:
+            print(f"Voice Input Error: {e}")
+            break
+        if heard and is_barge_in_command(heard, categories):
+            print(f"User interrupted: {heard}")
+            command = heard
+            # Stop synthesizing the rest and drop everything already queued for playback.
+            interrupt_event.set()
+            get_playback_engine().interrupt()
+            break
+    speaker.join()
+    return command
 
 def play_audio(audio_file, interrupt_event):
     # Play the provided audio file and allow for interruption if needed.
-    pygame.mixer.music.load(audio_file)
-    pygame.mixer.music.play()
-    while pygame.mixer.music.get_busy():
-        if interrupt_event.is_set():
-            pygame.mixer.music.stop()
-            break
-        time.sleep(0.1)
-
-def play_audio_sequence(audio_files, interrupt_event):
-    # Play a sequence of audio files one after another, stopping if interrupted.
-    for audio_file in audio_files:
-        if interrupt_event.is_set():
-            break
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            if interrupt_event.is_set():
-                pygame.mixer.music.stop()
-                break
-            time.sleep(0.1)
+    return get_playback_engine().play(audio_file, interrupt_event)
 
 def display_news_anchor_panel(video_url):
     # This is where you could display a video news anchor if desired.
     pass
 
-def interpret_user_intent(user_input, categories, headlines):
-    # Understand what the user wants based on their speech or text input.
-    numbered_headlines = [f"{idx+1}: {headline}" for idx, headline in enumerate(headlines)]
-    prompt = (
-        f"You are an assistant for a personalized newspaper application. "
-        f"The user's selected news categories are: {', '.join(categories)}. "
-        f"The headlines are: {', '.join(numbered_headlines)}. "
-        f"Your task is to interpret the user's intent based on their input and output a JSON object with an 'action' and relevant parameters. "
-        f"Possible actions are: 'select_category', 'select_headline', 'get_full_article', 'unknown'. "
-        f"For example, if the user says 'Tell me about Technology', your response should be {{'action': 'select_category', 'category': 'Technology'}}. "
-        f"If the user says 'I want to hear more about headline number two', your response should be {{'action': 'select_headline', 'headline': '2'}}. "
-        f"User says: \"{user_input}\" "
-        f"Your response should be a JSON object with keys 'action' and any relevant parameters, and nothing else."
-    )
-    try:
-        response = openai.ChatCompletion.create(
-            model='gpt-3.5-turbo',
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0,
-            request_timeout=10
-        )
-        assistant_reply = response.choices[0].message['content'].strip()
-        print(f"Assistant raw reply: {assistant_reply}")
-        json_match = re.search(r'\{.*?\}', assistant_reply, re.DOTALL)
-        if json_match:
-            json_text = json_match.group(0)
-            intent = json.loads(json_text)
-            return intent
-        else:
-            print("No JSON object found in assistant's reply.")
-            return {'action': 'unknown'}
-    except Exception as e:
-        print(f"Error interpreting user input: {e}")
-        return {'action': 'unknown'}
+@st.cache_resource
+def get_intent_recognizer():
+    # One recognizer per process so the memoized model answers are shared.
+    return IntentRecognizer(interpret_user_intent)
+
+def recognize_intent(user_input, categories, headlines):
+    # Try the local parser first and only ask the language model for ambiguous input.
+    recognizer = get_intent_recognizer()
+    intent, source = recognizer.recognize(user_input, categories, headlines)
+    increment('intents', source=source)
+    print(f"Assistant intent ({source}): {intent} | intent stats: {recognizer.stats()}")
+    return intent
+
+@st.cache_resource
+def get_voice_session():
+    # One audio input session per process: the microphone stays open and is calibrated only once.
+    return create_voice_session(VOICE_INPUT_FILES, VOICE_RECOGNIZER_BACKEND)
 
 def get_voice_input(timeout=5):
-    # Listen for user speech and convert it into text using Google’s speech recognition.
-    recognizer = sr.Recognizer()
+    # Listen for user speech and convert it into text with the configured recognizer.
     try:
-        with sr.Microphone() as source:
-            st.info("Listening...")
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            audio = recognizer.listen(source, timeout=timeout)
-            user_input = recognizer.recognize_google(audio)
+        st.info("Listening...")
+        user_input = get_voice_session().listen(timeout)
+        if user_input:
             print(f"User said: {user_input}")
-            return user_input
+        return user_input
     except Exception as e:
         print(f"Voice Input Error: {e}")
         return None
 
-def handle_user_interaction(categories, summaries):
+def handle_user_interaction(categories, edition):
     # Main loop to manage voice interactions after the greeting.
-    st.info("Voice interaction started. Say 'exit' to stop.")
+    st.info("Voice interaction started. Say 'exit' or 'goodbye' to stop.")
     last_headlines = None
     last_category = None
+    pending_input = None
     while True:
-        user_input = get_voice_input()
+        # Something said while the anchor was talking is handled before listening again.
+        user_input = pending_input or get_voice_input()
+        pending_input = None
         if user_input:
-            if "exit" in user_input.lower():
+            quick_intent, _ = parse_intent(user_input, categories)
+            if quick_intent['action'] == 'exit' or "exit" in user_input.lower():
                 # If the user says 'exit', provide a friendly goodbye and end the loop.
-                farewell_text = "Goodbye! Feel free to call me anytime."
+                farewell_text = FAREWELL_PROMPT
                 farewell_audio = generate_news_anchor_audio(farewell_text)
                 play_audio(farewell_audio, threading.Event())
                 break
             if not last_category:
                 # If we haven’t yet settled on a category, try to interpret what the user wants.
-                assistant_intent = interpret_user_intent(user_input, categories, [])
-                print(f"Assistant intent: {assistant_intent}")
+                assistant_intent = recognize_intent(user_input, categories, [])
                 if assistant_intent['action'] == 'select_category':
                     category = assistant_intent.get('category')
                     if category and category in categories:
                         # Provide the headlines for the chosen category.
                         last_category = category
-                        articles_in_category = [article for article in summaries if article['category'] == category]
-                        headlines = [article['title'] for article in articles_in_category]
+                        headlines = edition.headlines(category)
                         last_headlines = headlines
-                        headlines_text = f"Here are the top headlines in {category}: " + " ".join([f"{idx +1}: {headline}." for idx, headline in enumerate(headlines)])
+                        headlines_text = headlines_announcement(category, headlines)
                         response_audio_file = generate_news_anchor_audio(headlines_text)
                         play_audio(response_audio_file, threading.Event())
                     else:
                         # If the category isn’t recognized or not part of the user’s chosen categories.
-                        response_text = "I'm sorry, I didn't catch that category. Please choose from your selected categories."
+                        response_text = UNKNOWN_CATEGORY_PROMPT
                         response_audio_file = generate_news_anchor_audio(response_text)
                         play_audio(response_audio_file, threading.Event())
                 else:
                     # Prompt the user to pick a category.
-                    response_text = "Please tell me which category you'd like to hear about."
+                    response_text = CHOOSE_CATEGORY_PROMPT
                     response_audio_file = generate_news_anchor_audio(response_text)
                     play_audio(response_audio_file, threading.Event())
             else:
                 # We have a category selected, so now the user can choose a headline.
-                assistant_intent = interpret_user_intent(user_input, categories, last_headlines or [])
-                print(f"Assistant intent: {assistant_intent}")
+                assistant_intent = recognize_intent(user_input, categories, last_headlines or [])
                 if assistant_intent['action'] == 'select_headline':
                     # If the user wants a specific headline, provide its summary and possibly full text.
                     headline_index = assistant_intent.get('headline')
                     if headline_index:
                         try:
-                            idx = int(headline_index) - 1
-                            articles_in_category = [article for article in summaries if article['category'] == last_category]
-                            article = articles_in_category[idx]
-                            summary_text = f"Here is a summary of headline {headline_index}: {article['summary']}. Would you like the full article?"
-                            summary_chunks = generate_news_anchor_audio_chunks(summary_text)
-                            play_audio_sequence(summary_chunks, threading.Event())
+                            article = edition.headline(last_category, int(headline_index))
+                            summary_text = summary_announcement(headline_index, article.summary)
+                            interrupted_with = speak_interruptibly(summary_text, categories)
+                            if interrupted_with:
+                                pending_input = interrupted_with
+                                continue
                             # After the summary, listen again to see if they want the full article.
                             user_response = get_voice_input()
-                            if user_response and 'yes' in user_response.lower():
-                                full_text = f"Here is the full article: {article['full_text']}"
-                                full_text_chunks = generate_news_anchor_audio_chunks(full_text)
-                                play_audio_sequence(full_text_chunks, threading.Event())
+                            reply_intent, _ = parse_intent(user_response or '', categories)
+                            if reply_intent['action'] == 'exit':
+                                # "Goodbye" instead of an answer ends the session as usual.
+                                pending_input = user_response
+                            elif reply_intent['action'] == 'affirm' or (user_response and 'yes' in user_response.lower()):
+                                full_text = f"Here is the full article: {article.full_text}"
+                                pending_input = speak_interruptibly(full_text, categories)
                             else:
-                                acknowledgment_text = "Alright, let me know if you need anything else."
+                                acknowledgment_text = ACKNOWLEDGMENT_PROMPT
                                 acknowledgment_audio_file = generate_news_anchor_audio(acknowledgment_text)
                                 play_audio(acknowledgment_audio_file, threading.Event())
                         except (IndexError, ValueError):
                             # If the user’s headline number doesn’t exist.
-                            response_text = "I'm sorry, that headline number is not valid. Please choose a valid headline number."
+                            response_text = INVALID_HEADLINE_PROMPT
                             response_audio_file = generate_news_anchor_audio(response_text)
                             play_audio(response_audio_file, threading.Event())
                     else:
                         # If they said they want a headline but didn’t provide a number.
-                        response_text = "Which headline number are you interested in?"
+                        response_text = WHICH_HEADLINE_PROMPT
                         response_audio_file = generate_news_anchor_audio(response_text)
                         play_audio(response_audio_file, threading.Event())
                 elif assistant_intent['action'] == 'select_category':
                     # If the user wants to switch categories, reset and start over.
                     last_category = None
                     last_headlines = None
+                    pending_input = user_input
                     continue
                 else:
                     # If we don’t understand, prompt them to pick a headline number.
-                    response_text = "Please mention the headline number you're interested in."
+                    response_text = MENTION_HEADLINE_PROMPT
                     response_audio_file = generate_news_anchor_audio(response_text)
                     play_audio(response_audio_file, threading.Event())
         else:
             # If we didn't catch any user input.
-            prompt_text = "I didn't hear anything. Could you please repeat?"
+            prompt_text = NO_INPUT_PROMPT
             prompt_audio_file = generate_news_anchor_audio(prompt_text)
             play_audio(prompt_audio_file, threading.Event())
 
+def get_edition(user_id, categories, feedback_analysis, force=False):
+    # Return the reader's memoized edition for this session, or None if it has to be built.
+    session_key = f"edition:{user_id}"
+    edition = st.session_state.get(session_key)
+    prompt_variant = get_prompt_variant(feedback_analysis)
+    if force or edition is None or not edition.is_current(categories, prompt_variant):
+        # Prefer a bundle prebuilt by build_editions.py, then a snapshot from an
+        # earlier process; either saves fetching and summarizing again.
+        snapshot_path = edition_snapshot_path(categories, prompt_variant)
+        edition = None
+        if not force:
+            for bundle_name in (user_bundle_name(user_id), categories_bundle_name(categories)):
+                edition = load_bundle(bundle_name)
+                if edition is not None and edition.is_current(categories, prompt_variant):
+                    break
+                edition = None
+        if edition is None and not force:
+            edition = Edition.load(snapshot_path)
+        if edition is None or not edition.is_current(categories, prompt_variant):
+            return None
+        st.session_state[session_key] = edition
+    return edition
+
+def show_progressively(build, sorted_categories, page):
+    # Redraw the page as summaries stream in, at most once per PROGRESSIVE_RENDER_INTERVAL.
+    dirty = True
+    last_render = 0
+    while True:
+        if dirty and time.time() - last_render >= PROGRESSIVE_RENDER_INTERVAL:
+            with page.container():
+                components.html(render_newspaper(sorted_categories, build.edition), height=1500, scrolling=True)
+            last_render = time.time()
+            dirty = False
+        progressed, running = build.wait(PROGRESSIVE_RENDER_INTERVAL)
+        if not running:
+            break
+        # Only redraw when a summary or image actually changed.
+        dirty = dirty or progressed
+
+def play_greeting(greeting):
+    greeting_audio_file = generate_news_anchor_audio(greeting)
+    play_audio(greeting_audio_file, threading.Event())
+
+def choose_reader():
+    # Let the sidebar pick which reader's profile to use; returns a user id or NEW_READER.
+    profiles = {profile['id']: profile for profile in get_profile_store().list()}
+    options = list(profiles) + [NEW_READER]
+    current = st.session_state.get('current_reader')
+    user_id = st.sidebar.selectbox(
+        "Reader", options,
+        index=options.index(current) if current in options else 0,
+        format_func=lambda option: profiles[option]['name'] if option in profiles else option
+    )
+    st.session_state['current_reader'] = user_id
+    return user_id
+
 def main():
     global preferences
-    preferences = load_preferences()
+    user_id = choose_reader()
+    preferences = load_preferences(user_id) if user_id != NEW_READER else None
 
     # Create a nicer-looking sidebar with helpful info and options.
     st.sidebar.markdown(
@@ -401,19 +378,16 @@ def main():
                 'categories': selected_categories,
                 'last_updated': datetime.now().isoformat()
             }
-            save_preferences(preferences)
+            preferences = save_preferences(preferences)
+            st.session_state['current_reader'] = preferences['id']
             st.success("Preferences saved! Reload the page.")
             st.experimental_rerun()
     else:
         # Check past feedback to tailor the experience.
-        feedback_analysis = analyze_feedback()
+        feedback_analysis = analyze_feedback(user_id)
 
         # Sort categories by their feedback scores, so more positively received categories appear first.
-        sorted_categories = sorted(
-            preferences['categories'],
-            key=lambda x: feedback_analysis.get(x, {}).get('score', 0),
-            reverse=True
-        )
+        sorted_categories = order_categories(preferences['categories'], feedback_analysis)
 
         # Display a warm, personalized welcome message.
         st.markdown(
@@ -446,58 +420,50 @@ def main():
                 store_feedback(feedback, preferences)
                 st.success("Thank you for your feedback!")
 
-        # Fetch articles from the user’s preferred categories and summarize them.
-        articles = get_news_articles(sorted_categories)
-        summaries = summarize_articles(articles, feedback_analysis)
-
-        # Choose the first article’s summary as the “main headline.”
-        if summaries:
-            main_headline = {
-                'title': summaries[0]['title'],
-                'summary': summaries[0]['summary'],
-                'image': summaries[0].get('image', None)
-            }
-        else:
-            main_headline = {
-                'title': "No articles available",
-                'summary': "No summary available",
-                'image': None
-            }
-
-        # Organize articles by category for the displayed newspaper layout.
-        sections = [
-            {
-                'title': cat,
-                'articles': [art for art in summaries if art['category'] == cat]
-            } for cat in sorted_categories
-        ]
-
-        # Load and render the HTML template for the newspaper view.
-        with open('template.html', 'r', encoding='utf-8') as f:
-            template = Template(f.read())
-        html_content = template.render(
-            newspaper_title="The Daily News",
-            issue_details=f"{datetime.now().strftime('%A, %B %d, %Y')}",
-            main_headline=main_headline,
-            sections=sections
-        )
-        components.html(html_content, height=1500, scrolling=True)
+        # Reuse this session's edition unless its categories or prompt style changed,
+        # it has gone stale, or the user asked for a fresh one.
+        refresh_requested = st.sidebar.button("🔄 Refresh edition")
+        edition = get_edition(user_id, sorted_categories, feedback_analysis, force=refresh_requested)
 
         # Greet the user and invite them to choose a category to start with.
-        greeting = (
-            f"Good morning {preferences['name']}, I'm your AI News Reporter Emily. "
-            f"Today is {datetime.now().strftime('%A, %B %d')}, and your personalized newspaper has been generated. "
-            f"Your preferred news categories are {', '.join(sorted_categories)}. "
-            "Let me know which category should I start reporting with first."
-        )
-        greeting_audio_file = generate_news_anchor_audio(greeting)
+        greeting = greeting_text(preferences['name'], sorted_categories)
+        greeting_thread = None
+        page = st.empty()
+        if edition is None:
+            if PROGRESSIVE_RENDERING:
+                # Show headlines and descriptions right away, start the greeting, and
+                # fill in summaries as they stream in.
+                with st.spinner("Fetching headlines..."):
+                    build = ProgressiveBuild(sorted_categories, feedback_analysis, force=refresh_requested).start()
+                edition = build.edition
+                greeting_thread = threading.Thread(target=play_greeting, args=(greeting,), daemon=True)
+                greeting_thread.start()
+                edition.greeted = True
+                show_progressively(build, sorted_categories, page)
+            else:
+                with st.spinner("Preparing your newspaper..."):
+                    edition = build_edition(sorted_categories, feedback_analysis, force=refresh_requested)
+            edition.save(edition_snapshot_path(sorted_categories, edition.prompt_variant))
+            st.session_state[f"edition:{user_id}"] = edition
+
+        # Render the newspaper once per category order and reuse it on later reruns.
+        order = tuple(sorted_categories)
+        if order not in edition.rendered:
+            edition.rendered[order] = render_newspaper(sorted_categories, edition)
+        with page.container():
+            components.html(edition.rendered[order], height=1500, scrolling=True)
+
         display_news_anchor_panel(None)
 
-        # Play the greeting, then wait for user interaction.
-        play_audio(greeting_audio_file, threading.Event())
+        # Play the greeting once per edition, then wait for user interaction.
+        if not edition.greeted:
+            play_greeting(greeting)
+            edition.greeted = True
+        if greeting_thread is not None:
+            greeting_thread.join()
 
         # Begin handling voice commands.
-        handle_user_interaction(sorted_categories, summaries)
+        handle_user_interaction(sorted_categories, edition)
 
 if __name__ == "__main__":
     main()
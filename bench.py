@@ -0,0 +1,306 @@
+import argparse
+import io
+import json
+import math
+import os
+import random
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import requests
+from PIL import Image
+
+import images
+import news_fetcher
+import playback
+import renderer
+import shared_pool
+import summarizer
+import tts
+from edition import build_edition
+from intent_parser import IntentRecognizer, interpret_user_intent
+from metrics import get_metrics, span
+from voice_input import VoiceInputSession, WavFileInput
+
+# Runs the edition build and a voice turn end to end against local stand-ins
+# for NewsAPI, OpenAI and the TTS service, and reports p50/p95 per stage:
+#   python bench.py --iterations 20 --llm-latency 0.8 --json results.json
+DEFAULT_CATEGORIES = ['Business', 'Health', 'Sports', 'Technology']
+# Said on every voice turn; too vague for the local parser, so it goes to the model.
+VOICE_TURN_UTTERANCE = "what is going on with the economy lately"
+WORDS = (
+    "market council storm vaccine league startup merger court election drought rally "
+    "satellite orbit festival budget tariff striker hospital research battery chip "
+    "harvest museum bridge pipeline senate verdict launch recall outbreak treaty"
+).split()
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), renderer.TEMPLATE_FILE)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Dispatches to the server's route table after sleeping for its latency.
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is None:
+            self.send_error(404)
+            return
+        time.sleep(max(0.0, random.gauss(self.server.latency, self.server.latency * self.server.jitter)))
+        route(self, body)
+
+    def reply(self, body, content_type='application/json', status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(routes, latency, jitter):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.routes = routes
+    server.latency = latency
+    server.jitter = jitter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stub_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 900), (90, 120, 160)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def newsapi_routes(base_url):
+    image = stub_image()
+
+    def headlines(handler, body):
+        query = dict(
+            part.split('=', 1) for part in handler.path.split('?', 1)[-1].split('&') if '=' in part
+        )
+        category = query.get('category', 'general')
+        size = int(query.get('pageSize', 5))
+        rng = random.Random(category)
+        articles = []
+        for idx in range(size):
+            words = ' '.join(rng.sample(WORDS, 12))
+            articles.append({
+                'title': f"{category.title()} story {idx + 1}: {' '.join(rng.sample(WORDS, 4))}",
+                'description': f"{category} {idx} {words}",
+                'content': f"{category} report {idx}. " + ' '.join(rng.choice(WORDS) for _ in range(120)),
+                'url': f"{base_url}/articles/{category}/{idx}",
+                'urlToImage': f"{base_url}/image.jpg?{category}-{idx}",
+                'publishedAt': '2024-01-01T00:00:00Z',
+            })
+        handler.reply(json.dumps({'status': 'ok', 'articles': articles}).encode('utf-8'))
+
+    def picture(handler, body):
+        handler.reply(image, 'image/jpeg')
+
+    return {'/v2/top-headlines': headlines, '/image.jpg': picture}
+
+
+def openai_reply(prompt):
+    batch = re.search(r"Summarize each of the following (\d+) articles", prompt)
+    if batch:
+        titles = re.findall(r"^Title: (.*)$", prompt, re.MULTILINE)
+        return json.dumps([
+            {'id': idx, 'summary': f"Summary of {title}."} for idx, title in enumerate(titles, start=1)
+        ])
+    if 'personalized newspaper application' in prompt:
+        categories = re.search(r"categories are: ([^.]*)\.", prompt).group(1).split(', ')
+        return json.dumps({'action': 'select_category', 'category': categories[0]})
+    title = re.search(r"^Title: (.*)$", prompt, re.MULTILINE)
+    return f"Summary of {title.group(1) if title else 'the article'}."
+
+
+def openai_routes():
+
+    def completions(handler, body):
+        request = json.loads(body)
+        prompt = request['messages'][0]['content']
+        reply = openai_reply(prompt)
+        if not request.get('stream'):
+            handler.reply(json.dumps({
+                'id': 'stub', 'object': 'chat.completion', 'model': request['model'],
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(reply) // 4,
+                          'total_tokens': (len(prompt) + len(reply)) // 4},
+            }).encode('utf-8'))
+            return
+        events = [
+            {'id': 'stub', 'object': 'chat.completion.chunk', 'model': request['model'],
+             'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]}
+            for word in reply.split()
+        ]
+        stream = ''.join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        handler.reply(stream.encode('utf-8'), 'text/event-stream')
+
+    return {'/v1/chat/completions': completions}
+
+
+def tts_routes():
+
+    def speech(handler, body):
+        # About a tenth of a second of silent audio per ten characters.
+        handler.reply(silent_wav(len(body) / 100), 'audio/wav')
+
+    return {'/speech': speech}
+
+
+def silent_wav(seconds, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b'\0\0' * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def http_synthesizer(url):
+    session = requests.Session()
+
+    def synthesize(text, lang, path):
+        response = session.post(url, data=text.encode('utf-8'), timeout=30)
+        response.raise_for_status()
+        with open(path, 'wb') as f:
+            f.write(response.content)
+
+    return synthesize
+
+
+def write_utterance(path, text, rate=16000):
+    # A second of tone between quiet padding, with its transcript next to it.
+    frames = []
+    for idx in range(int(rate * 2.5)):
+        t = idx / rate
+        amplitude = 8000 if 0.5 < t < 1.5 else 20
+        frames.append(int(amplitude * math.sin(2 * math.pi * 300 * t)))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack(f'<{len(frames)}h', *frames))
+    with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def reset_caches(directory, tts_url, playback_seconds):
+    # Start from empty caches kept under directory.
+    os.makedirs(directory)
+    os.chdir(directory)
+    news_fetcher._headline_cache = None
+    summarizer._engine = None
+    shared_pool._pool = None
+    images._image_cache = None
+    renderer._fragments.clear()
+    renderer._pages.clear()
+    tts._audio_cache = tts.AudioCache(synthesizer=http_synthesizer(tts_url))
+    playback._playback_engine = playback.PlaybackEngine(playback.NullBackend(playback_seconds))
+
+
+def voice_turn(session, recognizer, edition, categories):
+    user_input = session.listen()
+    intent, _ = recognizer.recognize(user_input, categories, [])
+    category = intent.get('category') or categories[0]
+    text = tts.headlines_announcement(category, edition.headlines(category))[:tts.TTS_CHUNK_SIZE]
+    path = tts.get_audio_cache().synthesize(text)
+    playback.get_playback_engine().play(path)
+
+
+def run(args):
+    news_server, news_url = start_stub({}, args.newsapi_latency, args.jitter)
+    news_server.routes.update(newsapi_routes(news_url))
+    llm_server, llm_url = start_stub(openai_routes(), args.llm_latency, args.jitter)
+    tts_server, tts_url = start_stub(tts_routes(), args.tts_latency, args.jitter)
+    servers = [news_server, llm_server, tts_server]
+
+    news_fetcher.NEWSAPI_URL = f"{news_url}/v2/top-headlines"
+    openai.api_base = f"{llm_url}/v1"
+    openai.api_key = 'bench'
+    renderer.TEMPLATE_FILE = TEMPLATE_PATH
+    categories = args.categories
+
+    work_dir = tempfile.mkdtemp(prefix='anchordesk-bench-')
+    original_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        utterance = os.path.join(work_dir, 'utterance.wav')
+        write_utterance(utterance, VOICE_TURN_UTTERANCE)
+        audio_input = WavFileInput([utterance] * args.iterations)
+        session = VoiceInputSession(audio_input, audio_input.recognize)
+        get_metrics().reset()
+        for iteration in range(args.iterations):
+            if iteration == 0 or args.cold:
+                reset_caches(os.path.join(work_dir, str(iteration)), f"{tts_url}/speech", args.playback_seconds)
+                recognizer = IntentRecognizer(interpret_user_intent)
+            with span('bench_edition'):
+                edition = build_edition(categories, {}, args.articles)
+                renderer.render_newspaper(categories, edition)
+            with span('bench_voice_turn'):
+                voice_turn(session, recognizer, edition, categories)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for server in servers:
+            server.shutdown()
+    return report(args)
+
+
+def report(args):
+    metrics = get_metrics()
+    results = {}
+    for stage in metrics.stages():
+        values = metrics.percentiles(stage)
+        count = sum(
+            timing.count for (name, _), timing in metrics.timings.items() if name == stage
+        )
+        results[stage] = {'count': count, 'p50': values[0.5], 'p95': values[0.95]}
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, values in results.items():
+        print(f"{stage:<22}{values['count']:>7}{values['p50'] * 1000:>10.1f}{values['p95'] * 1000:>10.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'stages': results}, f, indent=2)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the edition and voice pipeline against local stubs.")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--categories', type=lambda value: [c.strip() for c in value.split(',') if c.strip()],
+                        default=DEFAULT_CATEGORIES, help="comma-separated categories")
+    parser.add_argument('--articles', type=int, default=5, help="articles per category")
+    parser.add_argument('--newsapi-latency', type=float, default=0.15, help="seconds per NewsAPI request")
+    parser.add_argument('--llm-latency', type=float, default=0.6, help="seconds per OpenAI request")
+    parser.add_argument('--tts-latency', type=float, default=0.3, help="seconds per TTS request")
+    parser.add_argument('--jitter', type=float, default=0.1, help="latency standard deviation, as a fraction")
+    parser.add_argument('--playback-seconds', type=float, default=0.0, help="how long each played track lasts")
+    parser.add_argument('--cold', action='store_true', help="start every iteration with empty caches")
+    parser.add_argument('--json', help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,130 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from bundles import categories_bundle_name, speech_texts, user_bundle_name, write_bundle
+from config import OPENAI_API_KEY
+from edition import build_edition, order_categories
+from feedback_store import get_feedback_store
+from metrics import start_metrics_server
+from profiles import get_profile_store
+from renderer import render_newspaper
+from tts import get_audio_cache
+
+# Build newspaper editions without Streamlit, either once or on a schedule:
+#   python build_editions.py --all-users
+#   python build_editions.py --user default --categories Business,Sports --interval 600
+openai.api_key = OPENAI_API_KEY
+
+DEFAULT_INTERVAL = 10 * 60
+DEFAULT_WORKERS = 2
+AUDIO_WORKERS = 4
+
+
+def synthesize_all(texts):
+    # Pre-synthesize speech through the shared audio cache; returns the mp3 paths.
+    cache = get_audio_cache()
+
+    def synthesize(text):
+        try:
+            return cache.synthesize(text)
+        except Exception as e:
+            print(f"Error synthesizing bundle audio: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=AUDIO_WORKERS) as pool:
+        paths = pool.map(synthesize, dict.fromkeys(texts))
+    return [path for path in paths if path]
+
+
+def build_bundle(name, categories, feedback_analysis, reader_name=None, user_id=None, with_audio=True):
+    # Fetch, dedup, summarize, render and voice one edition, then write it as a bundle.
+    started = time.time()
+    order = order_categories(categories, feedback_analysis)
+    edition = build_edition(order, feedback_analysis)
+    html = render_newspaper(order, edition)
+    audio_files = synthesize_all(speech_texts(edition, order, reader_name)) if with_audio else []
+    path = write_bundle(name, edition, order, html, audio_files, user_id)
+    print(f"Built {path}: {len(edition.articles)} articles, {len(audio_files)} audio files "
+          f"in {time.time() - started:.1f}s")
+    return path
+
+
+def user_target(user_id):
+    profile = get_profile_store().get(user_id)
+    if profile is None:
+        raise SystemExit(f"Unknown user: {user_id}")
+    return {
+        'name': user_bundle_name(user_id),
+        'categories': profile['categories'],
+        'reader_name': profile['name'],
+        'user_id': user_id,
+    }
+
+
+def categories_target(categories):
+    return {'name': categories_bundle_name(categories), 'categories': categories}
+
+
+def build_target(target, with_audio=True):
+    # Build one target; errors are reported so the rest of the run can continue.
+    user_id = target.get('user_id')
+    feedback_analysis = get_feedback_store().totals(user_id) if user_id else {}
+    try:
+        return build_bundle(
+            target['name'], target['categories'], feedback_analysis,
+            target.get('reader_name'), user_id, with_audio
+        )
+    except Exception as e:
+        print(f"Error building {target['name']}: {e}")
+        return None
+
+
+def build_all(targets, workers=DEFAULT_WORKERS, with_audio=True):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(lambda target: build_target(target, with_audio), targets))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build newspaper edition bundles outside Streamlit.")
+    parser.add_argument('--user', action='append', default=[], help="build for this user id (repeatable)")
+    parser.add_argument('--all-users', action='store_true', help="build for every saved profile")
+    parser.add_argument('--categories', action='append', default=[],
+                        help="build for a comma-separated category set (repeatable)")
+    parser.add_argument('--interval', type=float, default=None,
+                        help=f"rebuild every INTERVAL seconds (e.g. {DEFAULT_INTERVAL}) instead of once")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="editions built in parallel")
+    parser.add_argument('--no-audio', action='store_true', help="skip pre-synthesizing speech")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve Prometheus metrics on this port while running")
+    return parser.parse_args(argv)
+
+
+def resolve_targets(args):
+    # Re-read profiles on every run so the scheduler picks up new readers and categories.
+    get_profile_store().reload()
+    user_ids = list(args.user)
+    if args.all_users:
+        user_ids += [profile['id'] for profile in get_profile_store().list()]
+    targets = [user_target(user_id) for user_id in dict.fromkeys(user_ids)]
+    targets += [categories_target([c.strip() for c in value.split(',') if c.strip()]) for value in args.categories]
+    return targets
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not (args.user or args.all_users or args.categories):
+        raise SystemExit("Nothing to build: pass --user, --all-users or --categories.")
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    while True:
+        build_all(resolve_targets(args), args.workers, not args.no_audio)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
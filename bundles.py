@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import shutil
+
+from edition import Edition
+from images import get_image_cache
+from tts import (
+    CANNED_PROMPTS, TTS_CHUNK_SIZE, get_audio_cache, greeting_text, headlines_announcement,
+    split_into_chunks, summary_announcement
+)
+
+# Prebuilt editions: one directory per reader or category set, holding the
+# edition snapshot, the rendered page, its thumbnails and the audio the anchor
+# will need.
+BUNDLES_DIR = 'bundles'
+BUNDLE_MANIFEST = 'bundle.json'
+BUNDLE_EDITION = 'edition.json'
+BUNDLE_PAGE = 'newspaper.html'
+BUNDLE_AUDIO_DIR = 'audio'
+BUNDLE_IMAGES_DIR = 'images'
+
+
+def user_bundle_name(user_id):
+    return f"user-{user_id}"
+
+
+def categories_bundle_name(categories):
+    key = '|'.join(sorted(categories))
+    return "categories-" + hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+
+
+def speech_texts(edition, order, name=None):
+    # Everything the anchor says about this edition, split the way it will be synthesized.
+    texts = list(CANNED_PROMPTS)
+    if name:
+        texts.append(greeting_text(name, order)[:TTS_CHUNK_SIZE])
+    for category in order:
+        texts.append(headlines_announcement(category, edition.headlines(category))[:TTS_CHUNK_SIZE])
+        for article in edition.articles_in(category):
+            texts.extend(split_into_chunks(summary_announcement(article.number, article.summary)))
+    return texts
+
+
+def edition_images(edition):
+    # The cached thumbnails the edition's page links to.
+    paths = [article.thumbnail for article in edition.articles] + [edition.lead_thumbnail]
+    return sorted({path for path in paths if path and os.path.exists(path)})
+
+
+def write_bundle(name, edition, order, html, audio_files, user_id=None):
+    # Write the bundle into a scratch directory, then swap it in so readers never
+    # see a half-written bundle.
+    final_dir = os.path.join(BUNDLES_DIR, name)
+    tmp_dir = f"{final_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, BUNDLE_AUDIO_DIR))
+    os.makedirs(os.path.join(tmp_dir, BUNDLE_IMAGES_DIR))
+    edition.save(os.path.join(tmp_dir, BUNDLE_EDITION))
+    with open(os.path.join(tmp_dir, BUNDLE_PAGE), 'w', encoding='utf-8') as f:
+        f.write(html)
+    audio_names = []
+    for path in audio_files:
+        audio_name = os.path.basename(path)
+        shutil.copyfile(path, os.path.join(tmp_dir, BUNDLE_AUDIO_DIR, audio_name))
+        audio_names.append(audio_name)
+    image_names = []
+    for path in edition_images(edition):
+        image_name = os.path.basename(path)
+        shutil.copyfile(path, os.path.join(tmp_dir, BUNDLE_IMAGES_DIR, image_name))
+        image_names.append(image_name)
+    with open(os.path.join(tmp_dir, BUNDLE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({
+            'user_id': user_id,
+            'order': list(order),
+            'built_at': edition.built_at,
+            'audio': audio_names,
+            'images': image_names,
+        }, f)
+    old_dir = f"{final_dir}.old{os.getpid()}"
+    if os.path.exists(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return final_dir
+
+
+def load_bundle(name):
+    # Load a prebuilt edition with its rendered page; returns None if there is no bundle.
+    bundle_dir = os.path.join(BUNDLES_DIR, name)
+    try:
+        with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        with open(os.path.join(bundle_dir, BUNDLE_PAGE), 'r', encoding='utf-8') as f:
+            html = f.read()
+    except (OSError, ValueError):
+        return None
+    edition = Edition.load(os.path.join(bundle_dir, BUNDLE_EDITION))
+    if edition is None:
+        return None
+    edition.rendered[tuple(manifest['order'])] = html
+    install_bundle_files(bundle_dir, BUNDLE_AUDIO_DIR, manifest['audio'], get_audio_cache())
+    installed = install_bundle_files(
+        bundle_dir, BUNDLE_IMAGES_DIR, manifest.get('images', []), get_image_cache()
+    )
+    # Point the thumbnails at the installed copies, in case the image cache lives elsewhere.
+    for article in edition.articles:
+        if article.thumbnail and os.path.basename(article.thumbnail) in installed:
+            article.thumbnail = installed[os.path.basename(article.thumbnail)]
+    if edition.lead_thumbnail and os.path.basename(edition.lead_thumbnail) in installed:
+        edition.lead_thumbnail = installed[os.path.basename(edition.lead_thumbnail)]
+    return edition
+
+
+def install_bundle_files(bundle_dir, subdir, names, cache):
+    # Bundle audio and thumbnails are named by content hash, so they can be copied
+    # straight into their caches. Returns {name: cached path} for the files now in place.
+    installed = {}
+    for name in names:
+        target = os.path.join(cache.directory, name)
+        if not cache.lookup(target):
+            source = os.path.join(bundle_dir, subdir, name)
+            try:
+                cache.store(target, lambda tmp_path: shutil.copyfile(source, tmp_path))
+            except OSError as e:
+                print(f"Error installing bundle file {name}: {e}")
+                continue
+        installed[name] = target
+    return installed
@@ -0,0 +1,141 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from.
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'mc_cid', 'mc_eid', 'ocid', 'cmpid', 'ref', 'smid', 'taid'}
+AMP_PARAMS = {'amp', 'outputtype', 'output'}
+# Stories whose title-plus-description word sets overlap at least this much
+# (Jaccard similarity) count as the same story. Rewrites of one wire story score
+# about 0.5 and up; different stories on the same subject stay under 0.2.
+NEAR_DUPLICATE_MIN_SIMILARITY = 0.4
+# Words too common to say anything about which story an article is.
+STOP_WORDS = {
+    'a', 'after', 'an', 'and', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is',
+    'it', 'its', 'new', 'of', 'on', 'or', 'over', 's', 'says', 'that', 'the', 'their', 'this',
+    'to', 'was', 'were', 'will', 'with',
+}
+# Titles and texts shorter than this many words only match on URL.
+MIN_MATCH_WORDS = 4
+# The longest trailing " - Publisher" segment taken off a title when the source is unknown.
+MAX_PUBLISHER_WORDS = 3
+TITLE_SEPARATOR = r'\s+[-|–—]\s+'
+
+
+def normalize_url(url):
+    # Canonical form of an article URL: no tracking parameters, AMP variants,
+    # fragments, "www." prefix or trailing slash.
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host.startswith('amp.'):
+        host = host[4:]
+    path = re.sub(r'(/amp)+/?$|\.amp(?=\.html?$|$)', '', parts.path)
+    path = re.sub(r'^/amp/', '/', path).rstrip('/')
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+        and key.lower() not in TRACKING_PARAMS
+        and key.lower() not in AMP_PARAMS
+    ]
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def title_words(text):
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+def normalize_title(title, source=None):
+    # Lowercased title words without the " - Publisher" suffix NewsAPI appends.
+    # The last segment is only dropped when it names the article's source or, if
+    # the source is unknown, when it is short and the rest of the title is longer.
+    segments = re.split(TITLE_SEPARATOR, (title or '').strip())
+    words = title_words(title)
+    if len(segments) > 1:
+        head = title_words(' - '.join(segments[:-1]))
+        suffix = title_words(segments[-1])
+        if source:
+            if suffix == title_words(source):
+                words = head
+        elif len(suffix) <= MAX_PUBLISHER_WORDS and len(head) > len(suffix):
+            words = head
+    return ' '.join(words)
+
+
+def sketch_words(text):
+    # The words that identify a story: everything but the most common words.
+    return frozenset(word for word in title_words(text) if word not in STOP_WORDS)
+
+
+def similarity(a, b):
+    # Jaccard similarity of two word sets.
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def deduplicate_articles(articles):
+    # Collapse repeated stories into one article carrying every category it appeared under.
+    # Returns (unique articles, stats); each unique article gets a 'categories' list and
+    # 'positions', the indexes of its copies in the input.
+    unique = []
+    by_url = {}
+    by_title = {}
+    sketches = []
+    stats = {'fetched': len(articles), 'unique': 0, 'url_duplicates': 0, 'near_duplicates': 0}
+    for position, article in enumerate(articles):
+        url_key = normalize_url(article.get('url'))
+        title_key = normalize_title(article.get('title'), (article.get('source') or {}).get('name'))
+        sketch_text = f"{title_key} {article.get('description') or ''}"
+        # Very short titles and texts say too little to match on, so they only match on URL.
+        if len(title_key.split()) < MIN_MATCH_WORDS:
+            title_key = ''
+        sketch = sketch_words(sketch_text)
+        if len(sketch) < MIN_MATCH_WORDS:
+            sketch = None
+        match = by_url.get(url_key) if url_key else None
+        if match is not None:
+            stats['url_duplicates'] += 1
+        else:
+            match = by_title.get(title_key) if title_key else None
+            if match is None and sketch is not None:
+                # Editions hold a few dozen articles, so comparing every pair is cheap.
+                match = next(
+                    (idx for idx, other in sketches if similarity(sketch, other) >= NEAR_DUPLICATE_MIN_SIMILARITY),
+                    None
+                )
+            if match is not None:
+                stats['near_duplicates'] += 1
+        category = article.get('category', 'General')
+        if match is None:
+            story = dict(article)
+            story['categories'] = [category]
+            story['positions'] = [position]
+            match = len(unique)
+            unique.append(story)
+            if sketch is not None:
+                sketches.append((match, sketch))
+        elif category not in unique[match]['categories']:
+            unique[match]['categories'].append(category)
+            unique[match]['positions'].append(position)
+        if url_key:
+            by_url.setdefault(url_key, match)
+        if title_key:
+            by_title.setdefault(title_key, match)
+    stats['unique'] = len(unique)
+    stats['saved_calls'] = stats['fetched'] - stats['unique']
+    return unique, stats
+
+
+def expand_to_categories(unique_articles, summaries):
+    # Give every category its own copy of a story's summary, in the original fetch order.
+    placed = []
+    for article, summary in zip(unique_articles, summaries):
+        for position, category in zip(article['positions'], article['categories']):
+            copy = dict(summary)
+            copy['category'] = category
+            placed.append((position, copy))
+    placed.sort(key=lambda item: item[0])
+    return [summary for _, summary in placed]
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+
+# Eviction trims a full cache down to this fraction of max_bytes, so the next
+# scan is only needed after that much new data has been written.
+EVICT_TO_FRACTION = 0.9
+
+
+class DiskLRU:
+    # A directory of cached files trimmed in least-recently-used order. Reads bump
+    # a file's modification time, writes go through a temporary file so readers
+    # never see a partial one, and writes keep a running total of the directory
+    # size so it is only scanned once that total passes max_bytes.
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Bytes in the directory as of the last scan plus what was written since;
+        # None until the first scan.
+        self.size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def lookup(self, path):
+        # True if path is cached; marks it as recently used.
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, path, write):
+        # Call write(tmp_path) to produce the file, then move it into place at path.
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=self.directory)
+        os.close(fd)
+        try:
+            write(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.evict(size)
+        return path
+
+    def evict(self, added=0):
+        # Add the newly written bytes to the running total. Once it is over max_bytes,
+        # rescan the directory (other processes may write to it too) and delete the
+        # least recently used files until it is back under EVICT_TO_FRACTION of it.
+        with self.lock:
+            if self.size is not None:
+                self.size += added
+                if self.size <= self.max_bytes:
+                    return
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            target = self.max_bytes if total <= self.max_bytes else self.max_bytes * EVICT_TO_FRACTION
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self.size = total
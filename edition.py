@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from dedup import deduplicate_articles, expand_to_categories
+from images import localize_images
+from metrics import span
+from shared_pool import get_shared_pool
+from summarizer import article_content, get_prompt_variant, summary_record
+
+# How long an edition is reused before it is rebuilt with fresh headlines.
+EDITION_MAX_AGE = 15 * 60
+# Where edition snapshots are written so a restarted process can pick them up.
+EDITIONS_DIR = os.path.join('cache', 'editions')
+NO_FULL_TEXT = "Full text not available."
+SUMMARY_PENDING = "Summarizing..."
+
+
+def write_json_atomic(path, data):
+    # Write to a temporary file first so readers never see a half-written snapshot.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class FullTextStore:
+    # Article full texts, kept apart from the articles and only read from disk on first use.
+
+    def __init__(self, path=None, texts=None):
+        self.path = path
+        self.texts = texts
+
+    def get(self, article_id):
+        if self.texts is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.texts = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading full texts: {e}")
+                self.texts = {}
+        return self.texts.get(article_id, NO_FULL_TEXT)
+
+
+class Article:
+    # A compact record for one summarized article; full text is looked up lazily.
+    __slots__ = ('article_id', 'title', 'summary', 'url', 'image', 'category', 'number', 'text_store', 'thumbnail')
+
+    def __init__(self, article_id, title, summary, url, image, category, number, text_store, thumbnail=None):
+        self.article_id = article_id
+        self.title = title
+        self.summary = summary
+        self.url = url
+        self.image = image
+        self.category = category
+        self.number = number
+        self.text_store = text_store
+        # Path of the cached thumbnail, '' if the image could not be fetched, None if not tried.
+        self.thumbnail = thumbnail
+
+    @property
+    def full_text(self):
+        return self.text_store.get(self.article_id)
+
+    def to_dict(self):
+        return {
+            'id': self.article_id,
+            'title': self.title,
+            'summary': self.summary,
+            'url': self.url,
+            'image': self.image,
+            'category': self.category,
+            'number': self.number,
+            'thumbnail': self.thumbnail,
+        }
+
+
+class Edition:
+    # One built newspaper: articles indexed by category with stable headline numbers.
+
+    def __init__(self, categories, prompt_variant, articles, built_at=None):
+        self.categories = frozenset(categories)
+        self.prompt_variant = prompt_variant
+        self.articles = articles
+        self.built_at = time.time() if built_at is None else built_at
+        self.by_category = {}
+        for article in articles:
+            self.by_category.setdefault(article.category, []).append(article)
+        # The lead story's wider thumbnail; same conventions as Article.thumbnail.
+        self.lead_thumbnail = None
+        # Rendered HTML per category order, so re-sorting never re-fetches.
+        self.rendered = {}
+        self.greeted = False
+
+    @classmethod
+    def from_summaries(cls, categories, prompt_variant, summaries):
+        # Build an edition from summary records, numbering headlines per category.
+        texts = {}
+        articles = []
+        numbers = {}
+        for idx, item in enumerate(summaries):
+            article_id = str(idx)
+            texts[article_id] = item['full_text']
+            numbers[item['category']] = numbers.get(item['category'], 0) + 1
+            articles.append(Article(
+                article_id, item['title'], item['summary'], item['url'], item.get('image'),
+                item['category'], numbers[item['category']], None
+            ))
+        store = FullTextStore(texts=texts)
+        for article in articles:
+            article.text_store = store
+        return cls(categories, prompt_variant, articles)
+
+    @property
+    def lead(self):
+        # The article shown as the main headline, or None for an empty edition.
+        return self.articles[0] if self.articles else None
+
+    def articles_in(self, category):
+        return self.by_category.get(category, [])
+
+    def headlines(self, category):
+        return [article.title for article in self.articles_in(category)]
+
+    def headline(self, category, number):
+        # Look up a headline by its spoken 1-based number; raises IndexError if out of range.
+        articles = self.articles_in(category)
+        if not 1 <= number <= len(articles):
+            raise IndexError(f"No headline {number} in {category}")
+        return articles[number - 1]
+
+    def sections(self, order):
+        return [{'title': category, 'articles': self.articles_in(category)} for category in order]
+
+    def is_current(self, categories, prompt_variant, max_age=EDITION_MAX_AGE):
+        # An edition stays valid until its inputs change or it gets too old.
+        return (
+            self.categories == frozenset(categories)
+            and self.prompt_variant == prompt_variant
+            and time.time() - self.built_at < max_age
+        )
+
+    def save(self, path):
+        # Snapshot the edition to path, with the full texts in a sidecar file.
+        text_path = f"{path}.text"
+        store = self.articles[0].text_store if self.articles else FullTextStore(texts={})
+        write_json_atomic(text_path, {article.article_id: article.full_text for article in self.articles})
+        write_json_atomic(path, {
+            'categories': sorted(self.categories),
+            'prompt_variant': self.prompt_variant,
+            'built_at': self.built_at,
+            'lead_thumbnail': self.lead_thumbnail,
+            'articles': [article.to_dict() for article in self.articles],
+        })
+        store.path = text_path
+
+    @classmethod
+    def load(cls, path):
+        # Restore a snapshot written by save(); returns None if there is none.
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        store = FullTextStore(path=f"{path}.text")
+        articles = [
+            Article(
+                item['id'], item['title'], item['summary'], item['url'], item['image'],
+                item['category'], item['number'], store, item.get('thumbnail')
+            ) for item in data['articles']
+        ]
+        edition = cls(data['categories'], data['prompt_variant'], articles, data['built_at'])
+        edition.lead_thumbnail = data.get('lead_thumbnail')
+        return edition
+
+
+def edition_snapshot_path(categories, prompt_variant):
+    # Snapshots are keyed by the category set and prompt variant they were built for.
+    key = '|'.join(sorted(categories)) + '|' + prompt_variant
+    return os.path.join(EDITIONS_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest()[:16] + '.json')
+
+
+def order_categories(categories, feedback_analysis):
+    # Sort categories by their feedback scores, so more positively received categories appear first.
+    return sorted(
+        categories,
+        key=lambda x: feedback_analysis.get(x, {}).get('score', 0),
+        reverse=True
+    )
+
+
+def build_edition(categories, feedback_analysis, articles_per_category=5, force=False):
+    # Fetch and summarize everything needed for an edition.
+    # Stories that show up under several categories are summarized only once, and
+    # work is shared with other readers through the process-wide pool.
+    # force fetches fresh headlines instead of using the headline cache.
+    pool = get_shared_pool()
+    with span('build_edition') as details:
+        articles = pool.fetch(list(categories), articles_per_category, force)
+        unique_articles, dedup_stats = deduplicate_articles(articles)
+        print(f"Dedup: {dedup_stats}")
+        with span('summarize'):
+            summaries = pool.summarize(unique_articles, feedback_analysis)
+        summaries = expand_to_categories(unique_articles, summaries)
+        edition = Edition.from_summaries(categories, get_prompt_variant(feedback_analysis), summaries)
+        localize_images(edition)
+        details['articles'] = len(edition.articles)
+    return edition
+
+
+class ProgressiveBuild:
+    # Builds an edition in two steps: a draft using the NewsAPI descriptions is
+    # available as soon as the headlines are fetched, and summaries replace the
+    # descriptions as they stream in from the model.
+
+    def __init__(self, categories, feedback_analysis, articles_per_category=5, force=False):
+        self.feedback_analysis = feedback_analysis
+        articles = get_shared_pool().fetch(list(categories), articles_per_category, force)
+        self.unique_articles, dedup_stats = deduplicate_articles(articles)
+        print(f"Dedup: {dedup_stats}")
+        drafts = [
+            summary_record(article, article_content(article), article.get('description') or SUMMARY_PENDING)
+            for article in self.unique_articles
+        ]
+        self.edition = Edition.from_summaries(
+            categories, get_prompt_variant(feedback_analysis),
+            expand_to_categories(self.unique_articles, drafts)
+        )
+        # Each story may appear under several categories; map it to all of its copies.
+        rank = {position: idx for idx, position in enumerate(
+            sorted(position for article in self.unique_articles for position in article['positions'])
+        )}
+        self.copies = [
+            [self.edition.articles[rank[position]] for position in article['positions']]
+            for article in self.unique_articles
+        ]
+        self.updates = queue.Queue()
+        self.thread = threading.Thread(target=self._summarize, daemon=True)
+        self.image_thread = threading.Thread(target=self._localize_images, daemon=True)
+
+    def start(self):
+        self.image_thread.start()
+        self.thread.start()
+        return self
+
+    def _summarize(self):
+        try:
+            get_shared_pool().summarize_streaming(self.unique_articles, self.feedback_analysis, self._on_update)
+        finally:
+            self.image_thread.join()
+            self.updates.put(None)
+
+    def _localize_images(self):
+        try:
+            localize_images(self.edition)
+        finally:
+            self.updates.put('images')
+
+    def _on_update(self, idx, text, done):
+        if text:
+            for article in self.copies[idx]:
+                article.summary = text
+        self.updates.put(idx)
+
+    def wait(self, timeout):
+        # Wait up to timeout seconds for progress. Returns (progressed, running):
+        # whether anything changed, and False for running once every summary is done.
+        try:
+            item = self.updates.get(timeout=timeout)
+        except queue.Empty:
+            return False, True
+        while item is not None:
+            try:
+                item = self.updates.get_nowait()
+            except queue.Empty:
+                return True, True
+        return True, False
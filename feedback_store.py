@@ -0,0 +1,155 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Feedback is kept in an append-only SQLite log (WAL mode, so concurrent
+# sessions can write safely) with per-user, per-category aggregates kept up to date
+# on every write.
+FEEDBACK_DB_FILE = 'feedback.db'
+LEGACY_FEEDBACK_FILE = 'feedback.json'
+# Feedback imported from feedback.json belongs to the profile imported from preferences.json.
+LEGACY_USER_ID = 'default'
+# Half-lives, in seconds, of the time-decayed scoring windows.
+FEEDBACK_HALF_LIVES = {
+    'week': 7 * 24 * 3600,
+    'month': 30 * 24 * 3600,
+}
+
+
+class FeedbackStore:
+    # Append-only feedback log with incremental per-user, per-category score aggregates.
+
+    def __init__(self, path=FEEDBACK_DB_FILE, legacy_path=LEGACY_FEEDBACK_FILE,
+                 half_lives=FEEDBACK_HALF_LIVES):
+        self.half_lives = half_lives
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS feedback_log ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, timestamp TEXT NOT NULL, "
+            "created REAL NOT NULL, feedback TEXT NOT NULL, categories TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS category_totals ("
+            "user_id TEXT NOT NULL, category TEXT NOT NULL, score INTEGER NOT NULL, "
+            "count INTEGER NOT NULL, PRIMARY KEY (user_id, category))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS category_decayed ("
+            "user_id TEXT NOT NULL, category TEXT NOT NULL, window TEXT NOT NULL, score REAL NOT NULL, "
+            "count REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (user_id, category, window))"
+        )
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        # One-time import of the old feedback.json history into an empty log. The
+        # emptiness check and the inserts share one write transaction, so two
+        # processes starting at once cannot both import it.
+        with open(legacy_path, 'r') as f:
+            entries = json.load(f)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self.conn.execute("SELECT 1 FROM feedback_log LIMIT 1").fetchone():
+                    for entry in entries:
+                        created = datetime.fromisoformat(entry['timestamp']).timestamp()
+                        self._append(entry['feedback'], entry['preferences'], LEGACY_USER_ID, created)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _decay(self, window, value, since, now):
+        # Exponentially decay a value from time since to time now.
+        return value * math.exp(-math.log(2) * max(0.0, now - since) / self.half_lives[window])
+
+    def record(self, feedback, categories, user_id=LEGACY_USER_ID, created=None):
+        # Append one feedback entry and fold it into the aggregates atomically.
+        created = time.time() if created is None else created
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                timestamp = self._append(feedback, categories, user_id, created)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return {'timestamp': timestamp, 'feedback': feedback, 'preferences': categories}
+
+    def _append(self, feedback, categories, user_id, created):
+        # Insert one entry and update its aggregates; the caller holds the lock and
+        # an open transaction. Returns the entry's ISO timestamp.
+        value = 1 if feedback == 'positive' else -1
+        timestamp = datetime.fromtimestamp(created).isoformat()
+        self.conn.execute(
+            "INSERT INTO feedback_log (user_id, timestamp, created, feedback, categories) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, timestamp, created, feedback, json.dumps(categories))
+        )
+        for category in categories:
+            self.conn.execute(
+                "INSERT INTO category_totals (user_id, category, score, count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(user_id, category) DO UPDATE SET "
+                "score = score + excluded.score, count = count + 1",
+                (user_id, category, value)
+            )
+            for window in self.half_lives:
+                row = self.conn.execute(
+                    "SELECT score, count, updated FROM category_decayed "
+                    "WHERE user_id = ? AND category = ? AND window = ?",
+                    (user_id, category, window)
+                ).fetchone()
+                score, count, updated = row if row else (0.0, 0.0, created)
+                # Entries imported out of order decay forward to the newest timestamp.
+                newest = max(created, updated)
+                score = self._decay(window, score, updated, newest) + self._decay(window, value, created, newest)
+                count = self._decay(window, count, updated, newest) + self._decay(window, 1, created, newest)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO category_decayed "
+                    "(user_id, category, window, score, count, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, category, window, score, count, newest)
+                )
+        return timestamp
+
+    def totals(self, user_id=LEGACY_USER_ID):
+        # All-time score and count per category: one row per category, no log scan.
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT category, score, count FROM category_totals WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return {category: {'score': score, 'count': count} for category, score, count in rows}
+
+    def decayed(self, window, user_id=LEGACY_USER_ID, now=None):
+        # Time-decayed score and count per category for one of the configured windows.
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT category, score, count, updated FROM category_decayed WHERE user_id = ? AND window = ?",
+                (user_id, window)
+            ).fetchall()
+        return {
+            category: {
+                'score': self._decay(window, score, updated, now),
+                'count': self._decay(window, count, updated, now),
+            } for category, score, count, updated in rows
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feedback_store():
+    # One store per process; the WAL journal lets several processes share the file.
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeedbackStore()
+    return _store
@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+from disk_cache import DiskLRU
+from metrics import increment, span
+
+# Article images are downloaded once, shrunk to the width the template shows
+# them at, and kept in an LRU-trimmed disk cache. The cache lives under
+# Streamlit's static folder, so the page links to the files instead of
+# embedding them (needs server.enableStaticServing, see .streamlit/config.toml).
+IMAGE_CACHE_DIR = os.path.join('static', 'images')
+IMAGE_URL_PREFIX = 'app/static/images/'
+IMAGE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+LEAD_IMAGE_WIDTH = 1000
+ARTICLE_IMAGE_WIDTH = 560
+JPEG_QUALITY = 70
+MAX_DOWNLOAD_BYTES = 15 * 1024 * 1024
+IMAGE_TIMEOUT = (3.05, 10)
+MAX_CONCURRENT_DOWNLOADS = 8
+# Shown instead of images that could not be downloaded.
+PLACEHOLDER_IMAGE = (
+    "data:image/svg+xml;base64,"
+    + base64.b64encode(
+        b'<svg xmlns="http://www.w3.org/2000/svg" width="560" height="315">'
+        b'<rect width="100%" height="100%" fill="#e5e5e5"/></svg>'
+    ).decode('ascii')
+)
+
+
+class ImageCache(DiskLRU):
+    # Resized JPEG thumbnails keyed by a hash of the source URL and target width.
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        super().__init__(directory, max_bytes)
+        self.session = requests.Session()
+
+    def path_for(self, url, width):
+        digest = hashlib.sha256(f"{width}\0{url}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.jpg")
+
+    def thumbnail(self, url, width):
+        # Return the path of a cached thumbnail for url, or None if it cannot be fetched.
+        path = self.path_for(url, width)
+        if self.lookup(path):
+            increment('image_cache', result='hit')
+            return path
+        increment('image_cache', result='miss')
+        with span('image_download') as details:
+            try:
+                data = self._download(url)
+                image = Image.open(io.BytesIO(data))
+                image = image.convert('RGB')
+                image.thumbnail((width, width * 2))
+                self.store(path, lambda tmp_path: image.save(
+                    tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True
+                ))
+            except Exception as e:
+                print(f"Error fetching image {url}: {e}")
+                details['error'] = str(e)
+                return None
+            details['bytes'] = len(data)
+        return path
+
+    def _download(self, url):
+        with self.session.get(url, timeout=IMAGE_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            data = b''
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > MAX_DOWNLOAD_BYTES:
+                    raise ValueError("image too large")
+            return data
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache()
+    return _image_cache
+
+
+def localize_images(edition):
+    # Download and shrink every image in the edition concurrently. Each article's
+    # thumbnail is set to the cached file, or '' if the image could not be fetched;
+    # the lead story also gets a wider copy in edition.lead_thumbnail.
+    cache = get_image_cache()
+    jobs = {}
+    for article in edition.articles:
+        if article.image:
+            jobs.setdefault((article.image, ARTICLE_IMAGE_WIDTH), []).append(article)
+    lead = edition.lead
+    if lead is not None and lead.image:
+        jobs.setdefault((lead.image, LEAD_IMAGE_WIDTH), [])
+    if not jobs:
+        return
+    with span('localize_images'), ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_DOWNLOADS, len(jobs))) as pool:
+        results = pool.map(lambda job: cache.thumbnail(*job), jobs)
+        for (url, width), articles, path in zip(jobs, jobs.values(), results):
+            for article in articles:
+                article.thumbnail = path or ''
+            if width == LEAD_IMAGE_WIDTH and url == lead.image:
+                edition.lead_thumbnail = path or ''
+
+
+def image_src(url, thumbnail):
+    # What the page should load: the static URL of the local thumbnail, the
+    # placeholder if the download failed, or the original URL if it was never
+    # tried or the thumbnail has since been evicted.
+    if not url:
+        return None
+    if thumbnail:
+        if os.path.exists(thumbnail):
+            return IMAGE_URL_PREFIX + os.path.basename(thumbnail)
+        return url
+    if thumbnail == '':
+        return PLACEHOLDER_IMAGE
+    return url
@@ -0,0 +1,202 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import openai
+
+from metrics import increment, span
+
+# Local intents below this confidence are handed to the language model instead.
+FAST_PATH_MIN_CONFIDENCE = 0.8
+LLM_MEMO_SIZE = 256
+
+EXIT_WORDS = {'exit', 'quit', 'goodbye', 'bye'}
+YES_WORDS = {'yes', 'yeah', 'yep', 'yup', 'sure', 'ok', 'okay', 'absolutely', 'definitely', 'please'}
+NO_WORDS = {'no', 'nope', 'nah'}
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    'sixth': 6, 'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10,
+}
+# Speech recognition often hears these instead of a number right after "number".
+NUMBER_HOMOPHONES = {'won': 1, 'to': 2, 'too': 2, 'for': 4, 'fore': 4, 'ate': 8}
+NUMBER_KEYWORDS = {'number', 'headline', 'story', 'article', 'no'}
+CATEGORY_ALIASES = {
+    'tech': 'Technology', 'sport': 'Sports', 'showbiz': 'Entertainment',
+    'finance': 'Business', 'economy': 'Business', 'markets': 'Business',
+    'medicine': 'Health', 'medical': 'Health', 'news': 'General',
+}
+# Words that carry no meaning for picking a category or headline.
+FILLER_WORDS = {
+    'a', 'about', 'an', 'and', 'any', 'can', 'category', 'could', 'do', 'give', 'go', 'hear',
+    'i', "i'd", "i'm", 'in', 'is', 'it', "let's", 'lets', 'like', 'me', 'more', 'my', 'of',
+    'on', 'one', 'please', 'read', 'section', 'show', 'start', 'tell', 'that', 'the', 'to',
+    'uh', 'um', 'want', 'what', "what's", 'with', 'would', 'you',
+} | NUMBER_KEYWORDS
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def parse_number(token):
+    # Turn "2", "2nd", "two" or "second" into an int, or None.
+    match = re.fullmatch(r'(\d+)(st|nd|rd|th)?', token)
+    if match:
+        return int(match.group(1))
+    return NUMBER_WORDS.get(token)
+
+
+def match_category(token, categories):
+    # Map a word to one of the user's categories, accepting plurals and common aliases.
+    by_name = {category.lower(): category for category in categories}
+    for candidate in (token, token.rstrip('s'), token + 's'):
+        if candidate in by_name:
+            return by_name[candidate]
+    alias = CATEGORY_ALIASES.get(token)
+    if alias and alias.lower() in by_name:
+        return by_name[alias.lower()]
+    return None
+
+
+def parse_intent(user_input, categories):
+    # Recognize simple utterances without the language model.
+    # Returns (intent, confidence); intents use the same shape as interpret_user_intent.
+    tokens = tokenize(user_input or '')
+    if not tokens:
+        return {'action': 'unknown'}, 0.0
+    if EXIT_WORDS & set(tokens):
+        return {'action': 'exit'}, 0.95
+
+    numbers = []
+    found_categories = set()
+    unknown = 0
+    for idx, token in enumerate(tokens):
+        number = parse_number(token)
+        after_keyword = idx > 0 and tokens[idx - 1] in NUMBER_KEYWORDS
+        if number is None and after_keyword:
+            number = NUMBER_HOMOPHONES.get(token)
+        if number is not None:
+            numbers.append((token, number))
+            continue
+        category = match_category(token, categories)
+        if category:
+            found_categories.add(category)
+        elif token not in FILLER_WORDS and token not in YES_WORDS and token not in NO_WORDS:
+            unknown += 1
+    # "the second one": a bare "one" only counts when it is the only number.
+    if len(numbers) > 1:
+        numbers = [(token, number) for token, number in numbers if token != 'one']
+    # Everything else in the utterance lowers the confidence.
+    confidence = {0: 0.95, 1: 0.85}.get(unknown, 0.5)
+
+    if numbers and not found_categories:
+        if len({number for _, number in numbers}) > 1:
+            return {'action': 'unknown'}, 0.0
+        return {'action': 'select_headline', 'headline': str(numbers[0][1])}, confidence
+    if found_categories and not numbers:
+        if len(found_categories) > 1:
+            return {'action': 'unknown'}, 0.0
+        return {'action': 'select_category', 'category': found_categories.pop()}, confidence
+    if not numbers and not found_categories and len(tokens) <= 3:
+        if set(tokens) <= YES_WORDS | FILLER_WORDS and set(tokens) & YES_WORDS:
+            return {'action': 'affirm'}, 0.95
+        if set(tokens) & NO_WORDS and not set(tokens) & YES_WORDS:
+            return {'action': 'deny'}, 0.95
+    return {'action': 'unknown'}, 0.0
+
+
+def interpret_user_intent(user_input, categories, headlines):
+    # Understand what the user wants based on their speech or text input.
+    # Returns None if the model could not be reached or gave no usable answer.
+    numbered_headlines = [f"{idx+1}: {headline}" for idx, headline in enumerate(headlines)]
+    prompt = (
+        f"You are an assistant for a personalized newspaper application. "
+        f"The user's selected news categories are: {', '.join(categories)}. "
+        f"The headlines are: {', '.join(numbered_headlines)}. "
+        f"Your task is to interpret the user's intent based on their input and output a JSON object with an 'action' and relevant parameters. "
+        f"Possible actions are: 'select_category', 'select_headline', 'get_full_article', 'unknown'. "
+        f"For example, if the user says 'Tell me about Technology', your response should be {{'action': 'select_category', 'category': 'Technology'}}. "
+        f"If the user says 'I want to hear more about headline number two', your response should be {{'action': 'select_headline', 'headline': '2'}}. "
+        f"User says: \"{user_input}\" "
+        f"Your response should be a JSON object with keys 'action' and any relevant parameters, and nothing else."
+    )
+    try:
+        with span('llm_request', kind='intent') as details:
+            response = openai.ChatCompletion.create(
+                model='gpt-3.5-turbo',
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=150,
+                temperature=0,
+                request_timeout=10
+            )
+            usage = response.get('usage') or {}
+            details['prompt_tokens'] = usage.get('prompt_tokens', 0)
+            details['completion_tokens'] = usage.get('completion_tokens', 0)
+        increment('llm_tokens', details['prompt_tokens'], kind='intent', type='prompt')
+        increment('llm_tokens', details['completion_tokens'], kind='intent', type='completion')
+        assistant_reply = response.choices[0].message['content'].strip()
+        print(f"Assistant raw reply: {assistant_reply}")
+        json_match = re.search(r'\{.*?\}', assistant_reply, re.DOTALL)
+        if json_match:
+            json_text = json_match.group(0)
+            intent = json.loads(json_text)
+            return intent
+        else:
+            print("No JSON object found in assistant's reply.")
+            return None
+    except Exception as e:
+        print(f"Error interpreting user input: {e}")
+        return None
+
+
+class IntentRecognizer:
+    # Local fast path in front of the language model, with memoized model answers.
+
+    def __init__(self, llm_interpret, min_confidence=FAST_PATH_MIN_CONFIDENCE, memo_size=LLM_MEMO_SIZE):
+        self.llm_interpret = llm_interpret
+        self.min_confidence = min_confidence
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.lock = threading.Lock()
+        self.counts = {'fast_path': 0, 'memoized': 0, 'llm': 0}
+
+    def recognize(self, user_input, categories, headlines):
+        # Return (intent, source) where source is 'fast_path', 'memoized' or 'llm'.
+        intent, confidence = parse_intent(user_input, categories)
+        if confidence >= self.min_confidence:
+            return intent, self._count('fast_path')
+        key = (' '.join(tokenize(user_input)), tuple(categories), tuple(headlines))
+        with self.lock:
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                return dict(self.memo[key]), self._count('memoized', locked=True)
+        intent = self.llm_interpret(user_input, categories, headlines)
+        if not isinstance(intent, dict) or 'action' not in intent:
+            # Failures are not memoized, so the same words get another try next turn.
+            return {'action': 'unknown'}, self._count('llm')
+        with self.lock:
+            self.memo[key] = dict(intent)
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return intent, self._count('llm')
+
+    def _count(self, source, locked=False):
+        if locked:
+            self.counts[source] += 1
+        else:
+            with self.lock:
+                self.counts[source] += 1
+        return source
+
+    def stats(self):
+        # Share of turns answered without a model round trip.
+        with self.lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        counts['hit_rate'] = (counts['fast_path'] + counts['memoized']) / total if total else 0.0
+        return counts
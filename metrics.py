@@ -0,0 +1,236 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Timings and counters for every stage of the pipeline. Each finished span is
+# appended to a JSON-lines log, and everything can be scraped in the
+# Prometheus text format from a small HTTP endpoint.
+METRICS_PREFIX = 'anchordesk'
+METRICS_LOG_FILE = os.path.join('cache', 'metrics.jsonl')
+# The log is written by a background thread; records beyond METRICS_LOG_QUEUE_SIZE
+# waiting to be written are dropped, and once the file passes METRICS_LOG_MAX_BYTES
+# it is moved to metrics.jsonl.1 and a new one started.
+METRICS_LOG_QUEUE_SIZE = 10000
+METRICS_LOG_MAX_BYTES = 10 * 1024 * 1024
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9464
+# Histogram bucket bounds for stage timings, in seconds.
+TIMING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Recent timings kept per series for percentiles.
+MAX_SAMPLES = 2048
+
+
+class Timing:
+    __slots__ = ('buckets', 'count', 'total', 'samples')
+
+    def __init__(self):
+        self.buckets = [0] * len(TIMING_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+
+class Metrics:
+    # Process-wide registry; spans and counters are keyed by name and labels.
+
+    def __init__(self, log_file=METRICS_LOG_FILE, log_max_bytes=METRICS_LOG_MAX_BYTES):
+        self.log_file = log_file
+        self.log_max_bytes = log_max_bytes
+        self.lock = threading.Lock()
+        self.log_lock = threading.Lock()
+        self.log_queue = queue.Queue(maxsize=METRICS_LOG_QUEUE_SIZE)
+        self.log_writer = None
+        self.counters = {}
+        self.timings = {}
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self.lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = Timing()
+            for idx, bound in enumerate(TIMING_BUCKETS):
+                if seconds <= bound:
+                    timing.buckets[idx] += 1
+            timing.count += 1
+            timing.total += seconds
+            timing.samples.append(seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        # Time the block as one occurrence of stage. The yielded dict is logged with
+        # the span; setting its 'error' key counts the span as failed even if the
+        # block handled the error itself.
+        fields = {}
+        started = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe(stage, seconds, **labels)
+            if fields.get('error'):
+                self.increment('errors', stage=stage, **labels)
+            self.log(dict(labels, stage=stage, seconds=round(seconds, 6), **fields))
+
+    def log(self, record):
+        # Hand the record to the writer thread; never blocks the caller.
+        if not self.log_file:
+            return
+        line = json.dumps(dict(record, ts=round(time.time(), 3)), default=str)
+        with self.log_lock:
+            if self.log_writer is None:
+                self.log_writer = threading.Thread(target=self._write_log, daemon=True)
+                self.log_writer.start()
+        try:
+            self.log_queue.put_nowait(line)
+        except queue.Full:
+            self.increment('metrics_log_dropped')
+
+    def _write_log(self):
+        while True:
+            lines = [self.log_queue.get()]
+            while True:
+                try:
+                    lines.append(self.log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._rotate_log()
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+            except OSError as e:
+                print(f"Error writing metrics log: {e}")
+
+    def _rotate_log(self):
+        os.makedirs(os.path.dirname(self.log_file) or '.', exist_ok=True)
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            return
+        if self.log_max_bytes and size >= self.log_max_bytes:
+            os.replace(self.log_file, self.log_file + '.1')
+
+    def percentiles(self, stage, quantiles=(0.5, 0.95), **labels):
+        # Percentiles of recent timings over every series of stage matching labels.
+        wanted = set(labels.items())
+        with self.lock:
+            samples = sorted(
+                seconds
+                for (name, series_labels), timing in self.timings.items()
+                if name == stage and wanted <= set(series_labels)
+                for seconds in timing.samples
+            )
+        if not samples:
+            return None
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+    def stages(self):
+        with self.lock:
+            return sorted({name for name, _ in self.timings})
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.timings.clear()
+
+    def render_prometheus(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(
+                (key, list(timing.buckets), timing.count, timing.total)
+                for key, timing in self.timings.items()
+            )
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{METRICS_PREFIX}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{format_labels(labels)} {value}")
+        metric = f"{METRICS_PREFIX}_stage_seconds"
+        if timings:
+            lines.append(f"# TYPE {metric} histogram")
+        for (stage, labels), buckets, count, total in timings:
+            labels = (('stage', stage),) + labels
+            for bound, bucket_count in zip(TIMING_BUCKETS, buckets):
+                lines.append(f"{metric}_bucket{format_labels(labels + (('le', bound),))} {bucket_count}")
+            lines.append(f"{metric}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"{metric}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+    return _metrics
+
+
+def span(stage, **labels):
+    return get_metrics().span(stage, **labels)
+
+
+def increment(name, amount=1, **labels):
+    get_metrics().increment(name, amount, **labels)
+
+
+def observe(stage, seconds, **labels):
+    get_metrics().observe(stage, seconds, **labels)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    # Serve /metrics from a background thread; returns None if the port is taken.
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import NEWSAPI_KEY
+from metrics import increment, span
+
+# Settings for talking to NewsAPI.
+NEWSAPI_URL = 'https://newsapi.org/v2/top-headlines'
+MAX_CONCURRENT_REQUESTS = 4
+# (connect timeout, read timeout) in seconds, applied to every request.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Headline responses are reused for HEADLINE_CACHE_TTL seconds; after that the
+# cached copy is still served while a background refresh fetches a new one.
+# Past HEADLINE_MAX_STALE seconds the fetch is done first, and the old copy is
+# only served if that fetch fails.
+CACHE_DIR = 'cache'
+HEADLINE_CACHE_FILE = os.path.join(CACHE_DIR, 'headlines.db')
+HEADLINE_CACHE_TTL = 300
+HEADLINE_MAX_STALE = 3600
+
+_session = None
+_session_lock = threading.Lock()
+# Caps NewsAPI requests in flight across the whole process, however many
+# sessions are fetching at once, to match the connection pool size.
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def get_session():
+    # Share one keep-alive session so every category reuses the same TLS connections.
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+class HeadlineCache:
+    # Persistent per-(category, pageSize, language) cache of NewsAPI responses.
+
+    def __init__(self, path=HEADLINE_CACHE_FILE, ttl=HEADLINE_CACHE_TTL, max_stale=HEADLINE_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS headlines ("
+            "key TEXT PRIMARY KEY, articles TEXT NOT NULL, digest TEXT NOT NULL, "
+            "etag TEXT, fetched REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        # Return (articles, etag, age in seconds) for a key, or None if never fetched.
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT articles, etag, fetched FROM headlines WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], time.time() - row[2]
+
+    def touch(self, key):
+        # Mark an entry as fresh without rewriting it (the edition has not changed).
+        with self.lock:
+            self.conn.execute("UPDATE headlines SET fetched = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+    def put(self, key, articles, etag=None):
+        # Store a new response, skipping the rewrite when the articles are unchanged.
+        payload = json.dumps(articles, sort_keys=True)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        with self.lock:
+            row = self.conn.execute("SELECT digest FROM headlines WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] == digest:
+                self.conn.execute(
+                    "UPDATE headlines SET fetched = ?, etag = ? WHERE key = ?", (time.time(), etag, key)
+                )
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO headlines (key, articles, digest, etag, fetched) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, digest, etag, time.time())
+                )
+            self.conn.commit()
+
+    def start_refresh(self, key):
+        # Claim a key for background refresh; False if a refresh is already running.
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+
+_headline_cache = None
+_headline_cache_lock = threading.Lock()
+
+
+def get_headline_cache():
+    # One headline cache per process, shared by all sessions.
+    global _headline_cache
+    with _headline_cache_lock:
+        if _headline_cache is None:
+            _headline_cache = HeadlineCache()
+    return _headline_cache
+
+
+def request_category(category, articles_per_category=5, language='en', etag=None):
+    # Ask NewsAPI for one category's headlines.
+    # Returns (articles, etag); articles is None on error and 'unchanged' on a 304.
+    params = {
+        'category': category.lower(),
+        'language': language,
+        'pageSize': articles_per_category,
+        'apiKey': NEWSAPI_KEY,
+    }
+    headers = {'If-None-Match': etag} if etag else {}
+    with _request_slots, span('newsapi_request', category=category) as details:
+        try:
+            response = get_session().get(NEWSAPI_URL, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"Error fetching {category} headlines: {e}")
+            details['error'] = str(e)
+            return None, etag
+        details['status'] = response.status_code
+        if response.status_code == 304:
+            return 'unchanged', etag
+        if response.status_code != 200:
+            print(f"NewsAPI returned {response.status_code} for {category}")
+            details['error'] = f"status {response.status_code}"
+            return None, etag
+        articles = response.json().get('articles', [])
+    for article in articles:
+        article['category'] = category
+    return articles, response.headers.get('ETag')
+
+
+def refresh_category(cache, key, category, articles_per_category, language, etag=None):
+    # Fetch a category and update the cache. Errors leave the last good edition in place.
+    articles, new_etag = request_category(category, articles_per_category, language, etag)
+    if articles == 'unchanged':
+        cache.touch(key)
+    elif articles is not None:
+        cache.put(key, articles, new_etag)
+    return articles
+
+
+def _background_refresh(cache, key, category, articles_per_category, language, etag):
+    try:
+        refresh_category(cache, key, category, articles_per_category, language, etag)
+    finally:
+        cache.finish_refresh(key)
+
+
+def fetch_category(category, articles_per_category=5, language='en', force=False):
+    # Fetch the top headlines for a single category, going through the headline cache.
+    # force skips the cached copy (e.g. the reader asked for a fresh edition).
+    cache = get_headline_cache()
+    key = f"{category.lower()}|{articles_per_category}|{language}"
+    entry = cache.get(key)
+    if entry is not None:
+        articles, etag, age = entry
+        if force or age > cache.max_stale:
+            # Fetch now, and fall back to the old copy if that fails.
+            increment('headline_cache', result='forced' if force else 'expired')
+            fresh = refresh_category(cache, key, category, articles_per_category, language, etag)
+            return articles if fresh is None or fresh == 'unchanged' else fresh
+        increment('headline_cache', result='stale' if age > cache.ttl else 'hit')
+        if age > cache.ttl and cache.start_refresh(key):
+            # Stale: serve the cached copy now and refresh it in the background.
+            threading.Thread(
+                target=_background_refresh,
+                args=(cache, key, category, articles_per_category, language, etag),
+                daemon=True
+            ).start()
+        return articles
+    increment('headline_cache', result='miss')
+    articles = refresh_category(cache, key, category, articles_per_category, language)
+    if articles is None or articles == 'unchanged':
+        return []
+    return articles
+
+
+def fetch_categories(categories, articles_per_category=5, max_workers=MAX_CONCURRENT_REQUESTS, fetch=None):
+    # Fetch every category at the same time, with at most max_workers of this call's
+    # requests in flight (and never more than MAX_CONCURRENT_REQUESTS process-wide).
+    # Results are regrouped in the order the categories were given.
+    if not categories:
+        return []
+    fetch = fetch or fetch_category
+    workers = max(1, min(max_workers, len(categories)))
+    with span('fetch_news') as details, ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda c: fetch(c, articles_per_category), categories))
+        details['categories'] = len(categories)
+    all_articles = []
+    for articles in results:
+        all_articles.extend(articles)
+    return all_articles
@@ -0,0 +1,243 @@
+import itertools
+import queue
+import threading
+import time
+
+import pygame
+
+from metrics import increment, observe
+
+# The anchor's voice is played by one engine thread per process. Callers queue
+# tracks and wait on their completion events; the engine decodes the next track
+# while the current one plays and queues it on the mixer channel so chunks
+# follow each other without a gap.
+POLL_INTERVAL = 0.02
+
+
+class Track:
+    # One queued audio file; wait() blocks until it finished or was cut off.
+
+    def __init__(self, path, interrupt_event, generation):
+        self.path = path
+        self.interrupt_event = interrupt_event
+        self.generation = generation
+        self.handle = None
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.completed = False
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        # True if the track played to the end.
+        self.done.wait(timeout)
+        return self.completed
+
+
+class PygameBackend:
+    # Plays decoded sounds on a reserved mixer channel; queued sounds start gaplessly.
+
+    def __init__(self):
+        pygame.mixer.init()
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+    def load(self, path):
+        return pygame.mixer.Sound(path)
+
+    def start(self, handle):
+        self.channel.play(handle)
+
+    def queue(self, handle):
+        self.channel.queue(handle)
+
+    def current(self):
+        return self.channel.get_sound()
+
+    def stop(self):
+        self.channel.stop()
+
+
+class NullSound:
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+
+class NullBackend:
+    # Plays nothing, for headless runs and tests. Every track "lasts" duration
+    # seconds and the paths are recorded in played, in order.
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.played = []
+        self.playing = None
+        self.queued = None
+        self.ends_at = 0.0
+
+    def load(self, path):
+        return NullSound(path)
+
+    def start(self, handle):
+        self.playing = handle
+        self.queued = None
+        self.ends_at = time.monotonic() + self.duration
+        self.played.append(handle.path)
+
+    def queue(self, handle):
+        if self.current() is None:
+            self.start(handle)
+        else:
+            self.queued = handle
+
+    def current(self):
+        if self.playing is not None and time.monotonic() >= self.ends_at:
+            if self.queued is not None:
+                self.playing, self.queued = self.queued, None
+                self.ends_at += self.duration
+                self.played.append(self.playing.path)
+            else:
+                self.playing = None
+        return self.playing
+
+    def stop(self):
+        self.playing = None
+        self.queued = None
+
+
+class PlaybackEngine:
+    # Single playback thread fed by a queue of tracks.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        # interrupt() starts a new generation; tracks from older ones are dropped.
+        self.generations = itertools.count(1)
+        self.generation = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def enqueue(self, path, interrupt_event=None):
+        # Queue path behind whatever is playing; setting interrupt_event cancels it.
+        with self.lock:
+            track = Track(path, interrupt_event or threading.Event(), self.generation)
+        self.requests.put(track)
+        return track
+
+    def play(self, path, interrupt_event=None):
+        # Play path and block until it finished or was interrupted.
+        return self.enqueue(path, interrupt_event).wait()
+
+    def play_sequence(self, paths, interrupt_event=None):
+        tracks = [self.enqueue(path, interrupt_event) for path in paths]
+        return all([track.wait() for track in tracks])
+
+    def interrupt(self):
+        # Stop the current track and drop everything queued so far (barge-in).
+        with self.lock:
+            self.generation = next(self.generations)
+
+    def _cancelled(self, track):
+        return track.generation != self.generation or track.interrupt_event.is_set()
+
+    def _finish(self, track, completed):
+        if track.started_at is not None:
+            observe('playback', time.perf_counter() - track.started_at,
+                    result='completed' if completed else 'interrupted')
+        else:
+            increment('playback_dropped')
+        track.completed = completed
+        track.done.set()
+
+    def _started(self, track):
+        # Time from queueing to the first sound; near zero when the track was preloaded.
+        track.started_at = time.perf_counter()
+        observe('playback_wait', track.started_at - track.queued_at)
+
+    def _take(self, block):
+        # The next queued track that has not been cancelled, or None.
+        while True:
+            try:
+                track = self.requests.get(block=block)
+            except queue.Empty:
+                return None
+            if not self._cancelled(track):
+                return track
+            self._finish(track, False)
+
+    def _load(self, track):
+        try:
+            track.handle = self.backend.load(track.path)
+            return True
+        except Exception as e:
+            print(f"Error loading audio {track.path}: {e}")
+            self._finish(track, False)
+            return False
+
+    def _start(self, track):
+        if track.handle is None and not self._load(track):
+            return None
+        self.backend.start(track.handle)
+        self._started(track)
+        return track
+
+    def _run(self):
+        current = None
+        upcoming = None
+        while True:
+            if current is None:
+                current = self._start(self._take(block=True))
+                continue
+            if upcoming is None:
+                # Decode the next track now and queue it right behind the current one.
+                upcoming = self._take(block=False)
+                if upcoming is not None:
+                    if self._load(upcoming):
+                        self.backend.queue(upcoming.handle)
+                    else:
+                        upcoming = None
+            time.sleep(POLL_INTERVAL)
+
+            if self._cancelled(current):
+                self.backend.stop()
+                self._finish(current, False)
+                current = None
+                if upcoming is not None:
+                    if self._cancelled(upcoming):
+                        self._finish(upcoming, False)
+                    else:
+                        current = self._start(upcoming)
+                    upcoming = None
+                continue
+
+            playing = self.backend.current()
+            if playing is current.handle:
+                continue
+            self._finish(current, True)
+            if upcoming is not None and playing is upcoming.handle:
+                current = upcoming
+                self._started(current)
+            elif upcoming is not None:
+                current = self._start(upcoming)
+            else:
+                current = None
+            upcoming = None
+
+
+_playback_engine = None
+_playback_engine_lock = threading.Lock()
+
+
+def get_playback_engine():
+    # The process-wide engine; falls back to silent playback if there is no audio device.
+    global _playback_engine
+    with _playback_engine_lock:
+        if _playback_engine is None:
+            try:
+                backend = PygameBackend()
+            except pygame.error as e:
+                print(f"Audio output unavailable, playing silently: {e}")
+                backend = NullBackend()
+            _playback_engine = PlaybackEngine(backend)
+    return _playback_engine
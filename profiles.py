@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import tempfile
+import threading
+
+# Reader profiles (name and categories), keyed by user id.
+PROFILES_FILE = 'profiles.json'
+LEGACY_PREFERENCES_FILE = 'preferences.json'
+# The single user from preferences.json becomes this profile.
+LEGACY_USER_ID = 'default'
+
+
+def make_user_id(name):
+    # A readable id derived from the reader's name.
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'reader'
+
+
+class ProfileStore:
+    # All reader profiles in one JSON file, rewritten atomically on every change.
+
+    def __init__(self, path=PROFILES_FILE, legacy_path=LEGACY_PREFERENCES_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = {}
+        if os.path.exists(path):
+            self.reload()
+        elif legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                legacy = json.load(f)
+            if 'name' in legacy and 'categories' in legacy:
+                self.profiles[LEGACY_USER_ID] = dict(legacy, id=LEGACY_USER_ID)
+                self._write()
+
+    def reload(self):
+        # Pick up changes written by another process.
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                profiles = json.load(f)
+            with self.lock:
+                self.profiles = profiles
+
+    def _write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.profiles, f)
+        os.replace(tmp_path, self.path)
+
+    def list(self):
+        with self.lock:
+            return [dict(profile) for profile in self.profiles.values()]
+
+    def get(self, user_id):
+        with self.lock:
+            profile = self.profiles.get(user_id)
+            return dict(profile) if profile else None
+
+    def save(self, profile):
+        # Create or update a profile; new profiles get an id from their name.
+        with self.lock:
+            profile = dict(profile)
+            if 'id' not in profile:
+                base = make_user_id(profile['name'])
+                user_id = base
+                suffix = 2
+                while user_id in self.profiles:
+                    user_id = f"{base}-{suffix}"
+                    suffix += 1
+                profile['id'] = user_id
+            self.profiles[profile['id']] = profile
+            self._write()
+            return dict(profile)
+
+
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    global _profile_store
+    with _profile_store_lock:
+        if _profile_store is None:
+            _profile_store = ProfileStore()
+    return _profile_store
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from jinja2 import Template
+
+from images import PLACEHOLDER_IMAGE, image_src
+from metrics import increment, span
+
+TEMPLATE_FILE = 'template.html'
+# Rendered section fragments and pages kept per process.
+MAX_CACHED_FRAGMENTS = 256
+MAX_CACHED_PAGES = 32
+
+_lock = threading.Lock()
+_template = None
+_template_mtime = None
+_macros = None
+_fragments = OrderedDict()
+_pages = OrderedDict()
+
+
+def get_template():
+    # Compile the template once per process; recompile when the file changes on disk.
+    global _template, _template_mtime, _macros
+    mtime = os.path.getmtime(TEMPLATE_FILE)
+    with _lock:
+        if _template is None or mtime != _template_mtime:
+            with open(TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+                _template = Template(f.read())
+            # The template's macros, evaluated once with an empty edition.
+            _macros = _template.make_module(
+                {'main_headline': {}, 'sections': [], 'placeholder_image': PLACEHOLDER_IMAGE}
+            )
+            _template_mtime = mtime
+            # Fragments rendered with the old template are no longer valid.
+            _fragments.clear()
+            _pages.clear()
+        return _template, _macros, _template_mtime
+
+
+def _remember(cache, key, value, limit):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+
+def _lookup(cache, key):
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def section_key(section):
+    # A section only needs re-rendering when one of its visible fields changes.
+    return content_hash(section['title'], [
+        (article.title, article.summary, article.image, article.thumbnail, getattr(article, 'caption', None))
+        for article in section['articles']
+    ])
+
+
+def article_view(article, thumbnail=None):
+    # What the template shows for an article, with its image served from the local thumbnail.
+    return {
+        'title': article.title,
+        'summary': article.summary,
+        'image': image_src(article.image, thumbnail if thumbnail is not None else article.thumbnail),
+        'caption': getattr(article, 'caption', None),
+    }
+
+
+def render_section(macros, mtime, section):
+    # Render one section through the template's render_section macro, reusing the cached fragment.
+    key = (mtime, section_key(section))
+    fragment = _lookup(_fragments, key)
+    increment('render_cache', kind='section', result='miss' if fragment is None else 'hit')
+    if fragment is None:
+        fragment = str(macros.render_section({
+            'title': section['title'],
+            'articles': [article_view(article) for article in section['articles']],
+        }))
+        _remember(_fragments, key, fragment, MAX_CACHED_FRAGMENTS)
+    return key[1], fragment
+
+
+def render_newspaper(sorted_categories, edition):
+    # Lay out the edition as a newspaper page using the HTML template.
+    # Only sections whose articles changed are re-rendered; the rest come from the
+    # fragment cache and are spliced into the page.
+    with span('render'):
+        template, macros, mtime = get_template()
+
+        # Choose the first article’s summary as the “main headline.”
+        lead = edition.lead
+        if lead:
+            lead_key = (lead.title, lead.summary, lead.image, edition.lead_thumbnail)
+        else:
+            lead_key = None
+
+        # Organize articles by category for the displayed newspaper layout.
+        fragments = [render_section(macros, mtime, section) for section in edition.sections(sorted_categories)]
+        issue_details = f"{datetime.now().strftime('%A, %B %d, %Y')}"
+        page_key = (mtime, content_hash(issue_details, lead_key, [key for key, _ in fragments]))
+        page = _lookup(_pages, page_key)
+        increment('render_cache', kind='page', result='miss' if page is None else 'hit')
+        if page is None:
+            if lead:
+                main_headline = article_view(lead, edition.lead_thumbnail)
+            else:
+                main_headline = {
+                    'title': "No articles available",
+                    'summary': "No summary available",
+                    'image': None
+                }
+            page = template.render(
+                placeholder_image=PLACEHOLDER_IMAGE,
+                newspaper_title="The Daily News",
+                issue_details=issue_details,
+                main_headline=main_headline,
+                sections=[{'html': fragment} for _, fragment in fragments]
+            )
+            _remember(_pages, page_key, page, MAX_CACHED_PAGES)
+    return page
@@ -0,0 +1,181 @@
+import threading
+
+from news_fetcher import fetch_categories, fetch_category
+from summarizer import article_content, get_engine, summary_record
+
+
+class Flight:
+    # One in-progress piece of work that other callers can wait on.
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    # Makes sure only one caller does the work for a key while the others wait for it.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def claim(self, key):
+        # Returns (flight, leader). The leader must call finish() for the key.
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self.flights[key] = Flight()
+            return flight, True
+
+    def finish(self, key, result=None, error=None):
+        with self.lock:
+            flight = self.flights.pop(key)
+        flight.result = result
+        flight.error = error
+        flight.done.set()
+
+    def do(self, key, fn):
+        # Run fn() once for concurrent callers with the same key and share its result.
+        flight, leader = self.claim(key)
+        if not leader:
+            return flight.wait()
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+
+class SharedPool:
+    # Process-wide articles and summaries shared by every reader. Each category is
+    # fetched once and each article summarized once per prompt variant, however many
+    # readers ask for it at the same time; the caches behind it cover later requests.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.fetches = SingleFlight()
+        self.summaries = SingleFlight()
+
+    def fetch_category(self, category, articles_per_category=5, force=False):
+        articles = self.fetches.do(
+            (category, articles_per_category, force),
+            lambda: fetch_category(category, articles_per_category, force=force)
+        )
+        # Every reader gets its own copies of the shared articles.
+        return [dict(article) for article in articles]
+
+    def fetch(self, categories, articles_per_category=5, force=False):
+        # force bypasses the headline cache for this fetch.
+        return fetch_categories(
+            categories, articles_per_category,
+            fetch=lambda category, n: self.fetch_category(category, n, force)
+        )
+
+    def summarize(self, articles, feedback_analysis):
+        # Summarize articles, joining any identical request another reader already started.
+        contents = [article_content(article) for article in articles]
+        flights = {}
+        led = []
+        for idx, (article, content) in enumerate(zip(articles, contents)):
+            if not content:
+                continue
+            key = self.engine.cache_key(article, content, feedback_analysis)
+            if key in flights:
+                continue
+            flight, leader = self.summaries.claim(key)
+            flights[key] = flight
+            if leader:
+                led.append((key, idx))
+        try:
+            if led:
+                records = self.engine.summarize([articles[idx] for _, idx in led], feedback_analysis)
+                for (key, _), record in zip(led, records):
+                    self.summaries.finish(key, record['summary'])
+                led = []
+        finally:
+            # If summarizing failed, release the waiters rather than leave them hanging.
+            for key, _ in led:
+                self.summaries.finish(key, None)
+        summaries = []
+        for article, content in zip(articles, contents):
+            summary = None
+            if content:
+                summary = flights[self.engine.cache_key(article, content, feedback_analysis)].wait()
+            summaries.append(summary_record(article, content, summary))
+        return summaries
+
+    def summarize_streaming(self, articles, feedback_analysis, on_update):
+        # Like summarize(), but calls on_update(index, text, done) as summaries arrive:
+        # for articles this reader leads as the engine streams them in, and for articles
+        # another reader is already summarizing once that reader finishes.
+        contents = [article_content(article) for article in articles]
+        flights = {}
+        led = []
+        followed = []
+        for idx, (article, content) in enumerate(zip(articles, contents)):
+            if not content:
+                on_update(idx, None, True)
+                continue
+            key = self.engine.cache_key(article, content, feedback_analysis)
+            if key in flights:
+                followed.append((flights[key], idx))
+                continue
+            flight, leader = self.summaries.claim(key)
+            flights[key] = flight
+            if leader:
+                led.append((key, idx))
+            else:
+                followed.append((flight, idx))
+
+        def follow(flight, idx):
+            on_update(idx, flight.wait(), True)
+
+        followers = [threading.Thread(target=follow, args=item, daemon=True) for item in followed]
+        for follower in followers:
+            follower.start()
+        try:
+            if led:
+                led_indices = [idx for _, idx in led]
+                records = self.engine.summarize(
+                    [articles[idx] for idx in led_indices], feedback_analysis,
+                    lambda position, text, done: on_update(led_indices[position], text, done)
+                )
+                for (key, _), record in zip(led, records):
+                    self.summaries.finish(key, record['summary'])
+                led = []
+        finally:
+            # If summarizing failed, release the waiters rather than leave them hanging.
+            for key, _ in led:
+                self.summaries.finish(key, None)
+        for follower in followers:
+            follower.join()
+        summaries = []
+        for article, content in zip(articles, contents):
+            summary = None
+            if content:
+                summary = flights[self.engine.cache_key(article, content, feedback_analysis)].wait()
+            summaries.append(summary_record(article, content, summary))
+        return summaries
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    # One pool per process, shared by every reader's session.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SharedPool(get_engine())
+    return _pool
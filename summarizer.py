@@ -0,0 +1,414 @@
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from metrics import increment, span
+from summary_cache import SummaryCache, summary_cache_key
+
+# Settings for the summarization engine. The rate limits should match the
+# limits of the OpenAI account the app runs under.
+SUMMARY_MODEL = 'gpt-3.5-turbo'
+SUMMARY_MAX_TOKENS = 300
+MAX_CONCURRENT_SUMMARIES = 5
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 90000
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 20.0
+# Batching packs several articles into one request while the prompt plus the
+# expected replies fit in BATCH_TOKEN_BUDGET. Set it to None for one request
+# per article.
+BATCH_TOKEN_BUDGET = 3500
+MAX_BATCH_SIZE = 8
+BATCH_PROMPT_OVERHEAD_TOKENS = 100
+BATCH_OUTPUT_TOKENS_PER_ARTICLE = 250
+BATCH_REQUEST_TIMEOUT = 30
+SUMMARY_UNAVAILABLE = "Summary not available."
+
+
+PROMPT_SUFFIXES = {
+    'concise': "\nPlease make the summary concise and easy to understand.",
+    'detailed': "\nFeel free to include important details.",
+    'neutral': "",
+}
+
+
+def get_prompt_variant(feedback_analysis):
+    # Pick the summary style from the overall feedback trend.
+    overall_score = sum([cat['score'] for cat in feedback_analysis.values()])
+    if overall_score < 0:
+        # If feedback is generally negative, make summaries shorter and simpler.
+        return 'concise'
+    elif overall_score > 0:
+        # If feedback is positive, allow more detailed summaries.
+        return 'detailed'
+    # If it’s neutral, just use the base prompt.
+    return 'neutral'
+
+
+def adjust_prompt_based_on_feedback(base_prompt, feedback_analysis):
+    # Tune the prompt for the language model based on user feedback trends.
+    return base_prompt + PROMPT_SUFFIXES[get_prompt_variant(feedback_analysis)]
+
+
+def estimate_tokens(text):
+    # Rough token count (about four characters per token) used for rate limiting.
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    # A thread-safe token bucket that refills continuously at rate_per_minute.
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # Block until the requested amount is available, then take it.
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def count_tokens(kind, prompt_tokens, completion_tokens):
+    increment('llm_tokens', prompt_tokens, kind=kind, type='prompt')
+    increment('llm_tokens', completion_tokens, kind=kind, type='completion')
+
+
+def is_retryable_error(error):
+    # Rate limits (429) and server-side errors (5xx) are worth retrying, as are timeouts.
+    status = getattr(error, 'http_status', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (openai.error.Timeout, openai.error.APIConnectionError))
+
+
+class SummarizationEngine:
+    # Runs chat completions concurrently while staying under the request and token limits.
+
+    def __init__(self, model=SUMMARY_MODEL, max_concurrency=MAX_CONCURRENT_SUMMARIES,
+                 requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, cache=None, batch_token_budget=BATCH_TOKEN_BUDGET):
+        self.model = model
+        self.batch_token_budget = batch_token_budget
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+    def complete(self, prompt, max_tokens=SUMMARY_MAX_TOKENS, request_timeout=10, kind='summary'):
+        # Send one prompt to the model, retrying with jittered exponential backoff.
+        attempt = 0
+        while True:
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimate_tokens(prompt) + max_tokens)
+            try:
+                with span('llm_request', kind=kind) as details:
+                    response = openai.ChatCompletion.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                        temperature=0,
+                        request_timeout=request_timeout
+                    )
+                    usage = response.get('usage') or {}
+                    details['prompt_tokens'] = usage.get('prompt_tokens', 0)
+                    details['completion_tokens'] = usage.get('completion_tokens', 0)
+                count_tokens(kind, details['prompt_tokens'], details['completion_tokens'])
+                return response.choices[0].message['content'].strip()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                increment('llm_retries', kind=kind)
+                print(f"Retrying summary request in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def complete_stream(self, prompt, on_text, max_tokens=SUMMARY_MAX_TOKENS, request_timeout=10,
+                        kind='summary_stream'):
+        # Like complete(), but streams the reply and calls on_text(text so far) as it grows.
+        # Only failures before the first streamed token are retried.
+        attempt = 0
+        while True:
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimate_tokens(prompt) + max_tokens)
+            started = time.perf_counter()
+            text = ''
+            try:
+                with span('llm_request', kind=kind) as details:
+                    response = openai.ChatCompletion.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                        temperature=0,
+                        request_timeout=request_timeout,
+                        stream=True
+                    )
+                    for chunk in response:
+                        delta = chunk.choices[0].delta.get('content')
+                        if delta:
+                            if not text:
+                                details['first_token_seconds'] = round(time.perf_counter() - started, 6)
+                            text += delta
+                            on_text(text)
+                # Streamed replies carry no usage, so these counts are estimates.
+                count_tokens(kind, estimate_tokens(prompt), estimate_tokens(text))
+                return text.strip()
+            except Exception as e:
+                if text or attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                increment('llm_retries', kind=kind)
+                print(f"Retrying summary stream in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def summarize_one(self, article, content, cache_key, feedback_analysis, on_text=None):
+        # One chat completion for one article; returns None if the model call fails.
+        # With on_text, the reply is streamed and on_text(text so far) called as it grows.
+        prompt = summary_prompt(article, content, feedback_analysis)
+        try:
+            if on_text:
+                summary = self.complete_stream(prompt, on_text)
+            else:
+                summary = self.complete(prompt)
+        except Exception as e:
+            print(f"Error summarizing article: {e}")
+            return None
+        if self.cache:
+            self.cache.put(cache_key, summary)
+        return summary
+
+    def summarize_batch(self, batch, feedback_analysis, on_update=None):
+        # Summarize several (article, content, cache_key) items with one chat completion.
+        # Items the model leaves out or answers badly fall back to their own request.
+        # With on_update(position, text, done), the reply is streamed and each summary
+        # is reported as soon as its JSON object is complete.
+        def report(position, summary):
+            if on_update:
+                on_update(position, summary or SUMMARY_UNAVAILABLE, True)
+
+        if len(batch) == 1:
+            article, content, cache_key = batch[0]
+            on_text = (lambda text: on_update(0, text, False)) if on_update else None
+            summary = self.summarize_one(article, content, cache_key, feedback_analysis, on_text)
+            report(0, summary)
+            return [summary]
+        listing = "\n\n".join(
+            f"Article {idx}:\nTitle: {article['title']}\nContent: {content}"
+            for idx, (article, content, _) in enumerate(batch, start=1)
+        )
+        base_prompt = (
+            f"Summarize each of the following {len(batch)} articles in 150 words.\n"
+            f"Respond with only a JSON array of objects with keys \"id\" (the article number) "
+            f"and \"summary\", one object per article.\n\n{listing}"
+        )
+        adjusted_prompt = adjust_prompt_based_on_feedback(base_prompt, feedback_analysis)
+        max_tokens = BATCH_OUTPUT_TOKENS_PER_ARTICLE * len(batch)
+        parsed = {}
+
+        def on_text(text):
+            for idx, summary in parse_batch_items(text, len(batch)).items():
+                if idx not in parsed:
+                    parsed[idx] = summary
+                    report(idx - 1, summary)
+
+        try:
+            if on_update:
+                reply = self.complete_stream(
+                    adjusted_prompt, on_text, max_tokens=max_tokens,
+                    request_timeout=BATCH_REQUEST_TIMEOUT, kind='summary_batch_stream'
+                )
+            else:
+                reply = self.complete(
+                    adjusted_prompt, max_tokens=max_tokens,
+                    request_timeout=BATCH_REQUEST_TIMEOUT, kind='summary_batch'
+                )
+            parsed = {**parse_batch_reply(reply, len(batch)), **parsed}
+        except Exception as e:
+            print(f"Error summarizing batch of {len(batch)} articles: {e}")
+        summaries = []
+        for idx, (article, content, cache_key) in enumerate(batch, start=1):
+            summary = parsed.get(idx)
+            if summary is None:
+                increment('summary_batch_fallbacks')
+                summary = self.summarize_one(article, content, cache_key, feedback_analysis)
+                report(idx - 1, summary)
+            elif self.cache:
+                self.cache.put(cache_key, summary)
+            summaries.append(summary)
+        return summaries
+
+    def cache_key(self, article, content, feedback_analysis):
+        return summary_cache_key(article.get('url'), content, self.model, get_prompt_variant(feedback_analysis))
+
+    def summarize(self, articles, feedback_analysis, on_update=None):
+        # Summarize all articles concurrently; the output keeps the input order.
+        # Cache misses are packed into batches under batch_token_budget when batching is on.
+        # on_update(index, text, done), if given, is called from worker threads as
+        # summaries arrive; cached ones are reported straight away.
+        if not articles:
+            return []
+        contents = [article_content(article) for article in articles]
+        summaries = [None] * len(articles)
+        pending = []
+        for idx, (article, content) in enumerate(zip(articles, contents)):
+            if not content:
+                if on_update:
+                    on_update(idx, None, True)
+                continue
+            cache_key = self.cache_key(article, content, feedback_analysis)
+            summaries[idx] = self.cache.get(cache_key) if self.cache else None
+            if summaries[idx] is None:
+                pending.append((idx, (article, content, cache_key)))
+            elif on_update:
+                on_update(idx, summaries[idx], True)
+        if self.batch_token_budget:
+            batches = pack_batches(pending, self.batch_token_budget)
+        else:
+            batches = [[item] for item in pending]
+
+        def summarize_batch(batch):
+            indices = [idx for idx, _ in batch]
+            report = (lambda position, text, done: on_update(indices[position], text, done)) if on_update else None
+            return self.summarize_batch([item for _, item in batch], feedback_analysis, report)
+
+        if batches:
+            workers = max(1, min(self.max_concurrency, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for batch, batch_summaries in zip(batches, pool.map(summarize_batch, batches)):
+                    for (idx, _), summary in zip(batch, batch_summaries):
+                        summaries[idx] = summary
+        return [
+            summary_record(article, content, summary)
+            for article, content, summary in zip(articles, contents, summaries)
+        ]
+
+
+def summary_prompt(article, content, feedback_analysis):
+    base_prompt = (
+        f"Summarize the following article in 150 words:\n"
+        f"Title: {article['title']}\nContent: {content}"
+    )
+    return adjust_prompt_based_on_feedback(base_prompt, feedback_analysis)
+
+
+def article_content(article):
+    return article.get('content') or article.get('description') or ''
+
+
+def summary_record(article, content, summary):
+    # The dict shape used by the template and voice loop.
+    if not content:
+        # In case the article has no content to summarize.
+        print(f"No content available for article: {article['title']}")
+    return {
+        'title': article['title'],
+        'summary': summary or SUMMARY_UNAVAILABLE,
+        'full_text': content or "Full text not available.",
+        'url': article['url'],
+        'image': article.get('urlToImage'),
+        'category': article.get('category', 'General')
+    }
+
+
+def pack_batches(items, token_budget, max_size=MAX_BATCH_SIZE):
+    # Greedily group (index, (article, content, key)) items so each request stays
+    # within token_budget, counting prompt text and the expected reply.
+    batches = []
+    current = []
+    used = BATCH_PROMPT_OVERHEAD_TOKENS
+    for item in items:
+        article, content, _ = item[1]
+        cost = estimate_tokens(article['title'] + content) + BATCH_OUTPUT_TOKENS_PER_ARTICLE
+        if current and (used + cost > token_budget or len(current) >= max_size):
+            batches.append(current)
+            current = []
+            used = BATCH_PROMPT_OVERHEAD_TOKENS
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_reply(reply, count):
+    # Pull {id: summary} out of the model's JSON array, keeping only valid entries.
+    match = re.search(r'\[.*\]', reply, re.DOTALL)
+    if not match:
+        print("No JSON array found in batch summary reply.")
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except ValueError as e:
+        print(f"Could not parse batch summary reply: {e}")
+        return {}
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        add_batch_item(parsed, item, count)
+    return parsed
+
+
+def parse_batch_items(reply, count):
+    # Like parse_batch_reply, but for a reply that is still streaming in: returns
+    # the objects of the JSON array that are already complete.
+    parsed = {}
+    start = reply.find('[')
+    if start < 0:
+        return parsed
+    decoder = json.JSONDecoder()
+    position = start + 1
+    while True:
+        while position < len(reply) and reply[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(reply) or reply[position] == ']':
+            return parsed
+        try:
+            item, position = decoder.raw_decode(reply, position)
+        except ValueError:
+            return parsed
+        add_batch_item(parsed, item, count)
+
+
+def add_batch_item(parsed, item, count):
+    # Keep one {"id": ..., "summary": ...} object if it is valid.
+    if not isinstance(item, dict):
+        return
+    try:
+        idx = int(item.get('id'))
+    except (TypeError, ValueError):
+        return
+    summary = item.get('summary')
+    if 1 <= idx <= count and isinstance(summary, str) and summary.strip():
+        parsed[idx] = summary.strip()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    # One engine per process so every caller shares the same rate limits.
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SummarizationEngine(cache=SummaryCache())
+    return _engine
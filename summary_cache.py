@@ -0,0 +1,83 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import increment
+
+# Where summaries are cached and how long they are kept.
+CACHE_DIR = 'cache'
+SUMMARY_CACHE_FILE = os.path.join(CACHE_DIR, 'summaries.db')
+SUMMARY_CACHE_TTL = 7 * 24 * 3600
+SUMMARY_CACHE_MAX_ENTRIES = 5000
+# A hit only rewrites an entry's last_used time once it is this many seconds old,
+# so repeated hits on a warm cache are plain reads. Eviction order is only as
+# fine-grained as this.
+SUMMARY_LAST_USED_INTERVAL = 3600
+
+
+def summary_cache_key(url, content, model, prompt_variant):
+    # Content-addressed key: any change in article, model or prompt style gives a new key.
+    digest = hashlib.sha256()
+    for part in (url or '', content or '', model, prompt_variant):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    # A disk-backed summary cache with TTL expiry and least-recently-used eviction.
+
+    def __init__(self, path=SUMMARY_CACHE_FILE, ttl=SUMMARY_CACHE_TTL,
+                 max_entries=SUMMARY_CACHE_MAX_ENTRIES, last_used_interval=SUMMARY_LAST_USED_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.last_used_interval = last_used_interval
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.conn.commit()
+
+    def get(self, key):
+        # Return the cached summary, or None if it is missing or has expired.
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary, created, last_used FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                increment('summary_cache', result='miss')
+                return None
+            if now - row[2] > self.last_used_interval:
+                self.conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+            increment('summary_cache', result='hit')
+            return row[0]
+
+    def put(self, key, summary):
+        # Store a summary and evict anything expired or over the size cap.
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, summary, now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM summaries WHERE created < ?", (now - self.ttl,))
+        self.conn.execute(
+            "DELETE FROM summaries WHERE key IN ("
+            "SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import bundles
+import images
+import tts
+from disk_cache import DiskLRU
+from edition import Edition
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    # Fresh image and audio caches, as a serving process that has never seen the edition has.
+    image_cache = DiskLRU(str(tmp_path / 'serve' / 'images'), max_bytes=10 ** 6)
+    audio_cache = DiskLRU(str(tmp_path / 'serve' / 'tts'), max_bytes=10 ** 6)
+    monkeypatch.setattr(images, '_image_cache', image_cache)
+    monkeypatch.setattr(tts, '_audio_cache', audio_cache)
+    return image_cache, audio_cache
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.fixture
+def built(tmp_path):
+    # An edition as the builder leaves it: thumbnails and audio in the builder's caches.
+    edition = Edition.from_summaries(['Business'], 'v1', [
+        {'title': title, 'summary': f"{title}.", 'url': f"https://example.com/{idx}",
+         'image': f"https://example.com/{idx}.jpg", 'category': 'Business', 'full_text': ''}
+        for idx, title in enumerate(['Markets rally', 'Oil prices fall', 'Banks merge'])
+    ])
+    build_dir = tmp_path / 'build'
+    edition.articles[0].thumbnail = write_file(build_dir / 'images' / 'a560.jpg', b'small a')
+    edition.articles[1].thumbnail = write_file(build_dir / 'images' / 'b560.jpg', b'small b')
+    edition.articles[2].thumbnail = ''
+    edition.lead_thumbnail = write_file(build_dir / 'images' / 'a1000.jpg', b'wide a')
+    audio = [write_file(build_dir / 'tts' / 'hello.mp3', b'audio')]
+    bundles.write_bundle('user-default', edition, ['Business'], '<html></html>', audio, 'default')
+    return edition
+
+
+def test_bundle_carries_its_thumbnails(built):
+    bundle_images = os.path.join(bundles.BUNDLES_DIR, 'user-default', bundles.BUNDLE_IMAGES_DIR)
+    assert sorted(os.listdir(bundle_images)) == ['a1000.jpg', 'a560.jpg', 'b560.jpg']
+
+
+def test_load_installs_thumbnails_and_audio(built, caches):
+    image_cache, audio_cache = caches
+    loaded = bundles.load_bundle('user-default')
+    assert loaded.rendered[('Business',)] == '<html></html>'
+    assert sorted(os.listdir(image_cache.directory)) == ['a1000.jpg', 'a560.jpg', 'b560.jpg']
+    assert os.listdir(audio_cache.directory) == ['hello.mp3']
+    assert loaded.articles[0].thumbnail == os.path.join(image_cache.directory, 'a560.jpg')
+    assert loaded.lead_thumbnail == os.path.join(image_cache.directory, 'a1000.jpg')
+    assert loaded.articles[2].thumbnail == ''
+    with open(loaded.articles[1].thumbnail, 'rb') as f:
+        assert f.read() == b'small b'
+    assert image_cache.size == len(b'small a') + len(b'small b') + len(b'wide a')
+
+
+def test_evicted_thumbnails_are_restored(built, caches):
+    image_cache, _ = caches
+    bundles.load_bundle('user-default')
+    os.remove(os.path.join(image_cache.directory, 'a560.jpg'))
+    loaded = bundles.load_bundle('user-default')
+    assert os.path.exists(loaded.articles[0].thumbnail)
+
+
+def test_load_without_bundle_returns_none(caches):
+    assert bundles.load_bundle('user-nobody') is None
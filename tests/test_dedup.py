@@ -0,0 +1,117 @@
+from dedup import deduplicate_articles, expand_to_categories, normalize_title, normalize_url
+
+
+def make_article(title, url, description='', category='General', source=None):
+    article = {'title': title, 'url': url, 'description': description, 'category': category}
+    if source:
+        article['source'] = {'id': None, 'name': source}
+    return article
+
+
+def test_normalize_url_drops_tracking_and_amp():
+    assert normalize_url("http://www.example.com/story/amp/?utm_source=x&id=3#top") == \
+        normalize_url("https://example.com/story?id=3")
+
+
+def test_normalize_title_strips_the_publisher_suffix():
+    assert normalize_title("Stocks rally as inflation cools - CNBC") == "stocks rally as inflation cools"
+    assert normalize_title("Apple unveils iPhone 16 - The Verge", "The Verge") == "apple unveils iphone 16"
+
+
+def test_normalize_title_keeps_segments_that_are_not_a_publisher():
+    assert normalize_title("Biden - Trump debate recap") == "biden trump debate recap"
+    # A known source that does not match the suffix keeps the title whole.
+    assert normalize_title("Markets - What to watch this week", "Reuters") == "markets what to watch this week"
+
+
+def test_short_generic_titles_do_not_match():
+    articles = [
+        make_article("Live updates - CNN", "https://cnn.com/live/hurricane",
+                     "Hurricane Milton makes landfall in Florida", source="CNN"),
+        make_article("Live updates - BBC", "https://bbc.com/live/election",
+                     "Election results are coming in across the country", category='Politics', source="BBC"),
+    ]
+    unique, stats = deduplicate_articles(articles)
+    assert len(unique) == 2
+    assert stats['near_duplicates'] == 0
+
+
+def test_same_title_from_two_categories_is_one_story():
+    articles = [
+        make_article("Central bank holds rates steady for now - Reuters", "https://reuters.com/a", category='Business'),
+        make_article("Central bank holds rates steady for now - Reuters", "https://reuters.com/a?utm_medium=rss",
+                     category='General'),
+    ]
+    unique, stats = deduplicate_articles(articles)
+    assert len(unique) == 1
+    assert unique[0]['categories'] == ['Business', 'General']
+    assert stats['url_duplicates'] == 1
+
+
+def test_expand_to_categories_restores_fetch_order():
+    articles = [
+        make_article("Story one about the economy", "https://a.com/1", category='Business'),
+        make_article("Story two about the league", "https://a.com/2", category='Sports'),
+        make_article("Story one about the economy", "https://a.com/1", category='General'),
+    ]
+    unique, _ = deduplicate_articles(articles)
+    summaries = [{'title': story['title'], 'summary': story['title'].upper()} for story in unique]
+    placed = expand_to_categories(unique, summaries)
+    assert [(s['title'], s['category']) for s in placed] == [
+        ("Story one about the economy", 'Business'),
+        ("Story two about the league", 'Sports'),
+        ("Story one about the economy", 'General'),
+    ]
+
+
+STOCKS_AS = make_article(
+    "Stocks rally as inflation cools - CNBC", "https://cnbc.com/stocks-rally",
+    "Wall Street stocks rallied on Wednesday as a key inflation report showed consumer prices "
+    "rose less than expected in March, boosting hopes of rate cuts.", 'Business', "CNBC")
+STOCKS_AFTER = make_article(
+    "Stocks rally after inflation cools - Yahoo Finance", "https://finance.yahoo.com/news/stocks-rally",
+    "Wall Street stocks rallied Wednesday after a key inflation report showed consumer prices "
+    "rose less than expected in March, boosting hopes for rate cuts.", 'General', "Yahoo Finance")
+STOCKS_SLIDE = make_article(
+    "Stocks slide as bond yields jump - Reuters", "https://reuters.com/markets/stocks-slide",
+    "Wall Street stocks fell on Thursday as Treasury yields climbed after strong jobs data "
+    "dimmed hopes of rate cuts.", 'Business', "Reuters")
+IPHONE_CNBC = make_article(
+    "Apple unveils iPhone 16 with new camera button and AI features - CNBC", "https://cnbc.com/iphone-16",
+    "Apple on Monday announced the iPhone 16 and iPhone 16 Plus, featuring a new camera control "
+    "button and support for Apple Intelligence AI features.", 'Technology', "CNBC")
+IPHONE_VERGE = make_article(
+    "Apple announces the iPhone 16 and 16 Plus with a new Camera Control button - The Verge",
+    "https://theverge.com/iphone-16-plus",
+    "Apple's iPhone 16 and iPhone 16 Plus have a new Camera Control button, the A18 chip, and "
+    "support for Apple Intelligence features.", 'General', "The Verge")
+IPHONE_FORECAST = make_article(
+    "Apple shares fall after analyst cuts iPhone 16 sales forecast - Bloomberg", "https://bloomberg.com/apple",
+    "Shares of Apple fell 3% on Tuesday after an analyst cut the iPhone 16 shipment forecast, "
+    "citing weak demand in China.", 'Business', "Bloomberg")
+HURRICANE = make_article(
+    "Hurricane Milton makes landfall in Florida - AP", "https://apnews.com/milton",
+    "Hurricane Milton made landfall near Siesta Key on Wednesday night as a Category 3 storm, "
+    "bringing life-threatening storm surge.", 'General', "AP")
+
+
+def test_syndicated_rewrites_are_near_duplicates():
+    for first, second in [(STOCKS_AS, STOCKS_AFTER), (IPHONE_CNBC, IPHONE_VERGE)]:
+        unique, stats = deduplicate_articles([first, second])
+        assert len(unique) == 1, first['title']
+        assert stats['near_duplicates'] == 1
+        assert unique[0]['categories'] == [first['category'], second['category']]
+
+
+def test_different_stories_on_the_same_subject_stay_apart():
+    for first, second in [(STOCKS_AS, STOCKS_SLIDE), (IPHONE_CNBC, IPHONE_FORECAST), (STOCKS_AS, HURRICANE)]:
+        unique, stats = deduplicate_articles([first, second])
+        assert len(unique) == 2, (first['title'], second['title'])
+        assert stats['near_duplicates'] == 0
+
+
+def test_mixed_edition():
+    articles = [STOCKS_AS, IPHONE_CNBC, HURRICANE, STOCKS_SLIDE, STOCKS_AFTER, IPHONE_VERGE, IPHONE_FORECAST]
+    unique, stats = deduplicate_articles(articles)
+    assert [story['positions'] for story in unique] == [[0, 4], [1, 5], [2], [3], [6]]
+    assert stats['saved_calls'] == 2
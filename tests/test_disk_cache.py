@@ -0,0 +1,60 @@
+import os
+
+import disk_cache
+from disk_cache import DiskLRU
+
+
+def write_bytes(count):
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(b'x' * count)
+    return write
+
+
+def test_store_and_lookup(tmp_path):
+    cache = DiskLRU(str(tmp_path / 'cache'), max_bytes=1000)
+    path = os.path.join(cache.directory, 'a.bin')
+    assert not cache.lookup(path)
+    cache.store(path, write_bytes(10))
+    assert cache.lookup(path)
+    assert cache.size == 10
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    cache = DiskLRU(str(tmp_path / 'cache'), max_bytes=1000)
+
+    def fail(path):
+        raise RuntimeError("synthesis failed")
+
+    try:
+        cache.store(os.path.join(cache.directory, 'a.bin'), fail)
+    except RuntimeError:
+        pass
+    assert os.listdir(cache.directory) == []
+
+
+def test_evicts_least_recently_used_down_to_the_low_water_mark(tmp_path):
+    cache = DiskLRU(str(tmp_path / 'cache'), max_bytes=1000)
+    paths = [os.path.join(cache.directory, f"{idx}.bin") for idx in range(5)]
+    for idx, path in enumerate(paths):
+        cache.store(path, write_bytes(200))
+        os.utime(path, (1000 + idx, 1000 + idx))
+    # Reading the oldest file makes it the most recently used.
+    cache.lookup(paths[0])
+    cache.store(os.path.join(cache.directory, 'new.bin'), write_bytes(200))
+    remaining = sorted(os.listdir(cache.directory))
+    assert remaining == ['0.bin', '3.bin', '4.bin', 'new.bin']
+    assert cache.size == 800 <= 1000 * disk_cache.EVICT_TO_FRACTION
+
+
+def test_scans_only_when_the_running_total_passes_the_cap(tmp_path, monkeypatch):
+    cache = DiskLRU(str(tmp_path / 'cache'), max_bytes=1000)
+    scans = []
+    listdir = os.listdir
+    monkeypatch.setattr(disk_cache.os, 'listdir', lambda path: scans.append(path) or listdir(path))
+    for idx in range(4):
+        cache.store(os.path.join(cache.directory, f"{idx}.bin"), write_bytes(200))
+    # Only the first write scans, to learn the starting size.
+    assert len(scans) == 1
+    cache.store(os.path.join(cache.directory, 'big.bin'), write_bytes(400))
+    assert len(scans) == 2
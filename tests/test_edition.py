@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+from edition import NO_FULL_TEXT, Edition, edition_snapshot_path, order_categories
+
+
+def summary(title, category, full_text='Body text.'):
+    return {
+        'title': title,
+        'summary': f"Summary of {title}.",
+        'url': f"https://example.com/{title.lower().replace(' ', '-')}",
+        'image': None,
+        'category': category,
+        'full_text': full_text,
+    }
+
+
+@pytest.fixture
+def edition():
+    return Edition.from_summaries(['Business', 'Technology'], 'v1', [
+        summary('Markets rally', 'Business', 'Stocks rose.'),
+        summary('Chip shortage eases', 'Technology', 'Supply improved.'),
+        summary('Oil prices fall', 'Business', 'Crude dropped.'),
+    ])
+
+
+def test_headlines_are_numbered_per_category(edition):
+    assert edition.headlines('Business') == ['Markets rally', 'Oil prices fall']
+    assert edition.headline('Business', 2).title == 'Oil prices fall'
+    assert edition.headline('Technology', 1).number == 1
+    assert edition.lead.title == 'Markets rally'
+    with pytest.raises(IndexError):
+        edition.headline('Business', 3)
+    with pytest.raises(IndexError):
+        edition.headline('Sports', 1)
+
+
+def test_is_current(edition):
+    assert edition.is_current(['Technology', 'Business'], 'v1')
+    assert not edition.is_current(['Business'], 'v1')
+    assert not edition.is_current(['Business', 'Technology'], 'v2')
+    edition.built_at = time.time() - 3600
+    assert not edition.is_current(['Business', 'Technology'], 'v1')
+
+
+def test_save_and_load_round_trip(edition, tmp_path):
+    edition.lead_thumbnail = 'static/images/lead.jpg'
+    edition.articles[1].thumbnail = 'static/images/chip.jpg'
+    path = str(tmp_path / 'edition.json')
+    edition.save(path)
+
+    loaded = Edition.load(path)
+    assert loaded.categories == edition.categories
+    assert loaded.prompt_variant == 'v1'
+    assert loaded.built_at == edition.built_at
+    assert loaded.lead_thumbnail == 'static/images/lead.jpg'
+    assert [a.to_dict() for a in loaded.articles] == [a.to_dict() for a in edition.articles]
+    assert loaded.headline('Business', 2).full_text == 'Crude dropped.'
+
+
+def test_full_texts_are_read_lazily_from_sidecar(edition, tmp_path):
+    path = str(tmp_path / 'edition.json')
+    edition.save(path)
+    loaded = Edition.load(path)
+    store = loaded.articles[0].text_store
+    assert store.texts is None
+    assert loaded.articles[0].full_text == 'Stocks rose.'
+    assert store.texts is not None
+
+
+def test_missing_sidecar_falls_back(edition, tmp_path):
+    path = str(tmp_path / 'edition.json')
+    edition.save(path)
+    os.remove(f"{path}.text")
+    assert Edition.load(path).articles[0].full_text == NO_FULL_TEXT
+
+
+def test_load_without_snapshot_returns_none(tmp_path):
+    assert Edition.load(str(tmp_path / 'missing.json')) is None
+
+
+def test_snapshot_path_ignores_category_order():
+    assert edition_snapshot_path(['A', 'B'], 'v1') == edition_snapshot_path(['B', 'A'], 'v1')
+    assert edition_snapshot_path(['A', 'B'], 'v1') != edition_snapshot_path(['A', 'B'], 'v2')
+
+
+def test_order_categories_by_feedback_score():
+    analysis = {'Sports': {'score': -2}, 'Science': {'score': 3}}
+    assert order_categories(['Sports', 'World', 'Science'], analysis) == ['Science', 'World', 'Sports']
@@ -0,0 +1,134 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from feedback_store import FEEDBACK_HALF_LIVES, LEGACY_USER_ID, FeedbackStore
+
+DAY = 24 * 3600
+NOW = datetime(2024, 5, 1, 12, 0).timestamp()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'feedback.db')
+
+
+def write_legacy(path, entries):
+    with open(path, 'w') as f:
+        json.dump([
+            {'timestamp': datetime.fromtimestamp(created).isoformat(), 'feedback': feedback,
+             'preferences': categories}
+            for feedback, categories, created in entries
+        ], f)
+    return str(path)
+
+
+def log_size(store):
+    return store.conn.execute("SELECT COUNT(*) FROM feedback_log").fetchone()[0]
+
+
+def test_totals_add_up_per_user_and_category(db_path):
+    store = FeedbackStore(db_path, legacy_path=None)
+    store.record('positive', ['Business', 'Technology'], 'alice', NOW)
+    store.record('negative', ['Business'], 'alice', NOW)
+    store.record('positive', ['Business'], 'alice', NOW)
+    store.record('negative', ['Sports'], 'bob', NOW)
+    assert store.totals('alice') == {
+        'Business': {'score': 1, 'count': 3},
+        'Technology': {'score': 1, 'count': 1},
+    }
+    assert store.totals('bob') == {'Sports': {'score': -1, 'count': 1}}
+    assert store.totals('carol') == {}
+
+
+def test_record_returns_legacy_entry_format(db_path):
+    store = FeedbackStore(db_path, legacy_path=None)
+    entry = store.record('positive', ['World'], 'alice', NOW)
+    assert entry == {
+        'timestamp': datetime.fromtimestamp(NOW).isoformat(),
+        'feedback': 'positive',
+        'preferences': ['World'],
+    }
+
+
+def test_decayed_scores_halve_every_half_life(db_path):
+    store = FeedbackStore(db_path, legacy_path=None)
+    store.record('positive', ['Science'], 'alice', NOW)
+    week = FEEDBACK_HALF_LIVES['week']
+    assert store.decayed('week', 'alice', now=NOW)['Science']['score'] == pytest.approx(1.0)
+    assert store.decayed('week', 'alice', now=NOW + week)['Science']['score'] == pytest.approx(0.5)
+    assert store.decayed('month', 'alice', now=NOW + week)['Science']['score'] > 0.5
+
+
+def test_older_entries_weigh_less(db_path):
+    store = FeedbackStore(db_path, legacy_path=None)
+    store.record('negative', ['Science'], 'alice', NOW - 14 * DAY)
+    store.record('positive', ['Science'], 'alice', NOW)
+    decayed = store.decayed('week', 'alice', now=NOW)['Science']
+    assert decayed['score'] == pytest.approx(1 - 0.25)
+    assert decayed['count'] == pytest.approx(1 + 0.25)
+    assert store.totals('alice')['Science'] == {'score': 0, 'count': 2}
+
+
+def test_out_of_order_entries_give_the_same_scores(tmp_path):
+    entries = [('positive', ['Science'], NOW - 3 * DAY), ('negative', ['Science'], NOW - 10 * DAY)]
+    in_order = FeedbackStore(str(tmp_path / 'a.db'), legacy_path=None)
+    reversed_order = FeedbackStore(str(tmp_path / 'b.db'), legacy_path=None)
+    for feedback, categories, created in sorted(entries, key=lambda e: e[2]):
+        in_order.record(feedback, categories, 'alice', created)
+    for feedback, categories, created in entries:
+        reversed_order.record(feedback, categories, 'alice', created)
+    expected = in_order.decayed('week', 'alice', now=NOW)['Science']
+    actual = reversed_order.decayed('week', 'alice', now=NOW)['Science']
+    assert actual['score'] == pytest.approx(expected['score'])
+    assert actual['count'] == pytest.approx(expected['count'])
+
+
+def test_legacy_feedback_is_imported_once(db_path, tmp_path):
+    legacy = write_legacy(tmp_path / 'feedback.json', [
+        ('positive', ['Business'], NOW - DAY),
+        ('negative', ['Business', 'Sports'], NOW),
+    ])
+    store = FeedbackStore(db_path, legacy_path=legacy)
+    assert store.totals(LEGACY_USER_ID) == {
+        'Business': {'score': 0, 'count': 2},
+        'Sports': {'score': -1, 'count': 1},
+    }
+    reopened = FeedbackStore(db_path, legacy_path=legacy)
+    assert log_size(reopened) == 2
+    assert reopened.totals(LEGACY_USER_ID)['Business']['count'] == 2
+
+
+def test_legacy_feedback_is_not_imported_into_a_used_log(db_path, tmp_path):
+    FeedbackStore(db_path, legacy_path=None).record('positive', ['World'], 'alice', NOW)
+    legacy = write_legacy(tmp_path / 'feedback.json', [('positive', ['Business'], NOW)])
+    store = FeedbackStore(db_path, legacy_path=legacy)
+    assert store.totals(LEGACY_USER_ID) == {}
+
+
+def test_concurrent_opens_import_legacy_feedback_once(db_path, tmp_path):
+    legacy = write_legacy(tmp_path / 'feedback.json', [
+        ('positive', ['Business'], NOW - idx * 3600) for idx in range(200)
+    ])
+    FeedbackStore(db_path, legacy_path=None)
+    start = threading.Barrier(4)
+    errors = []
+
+    def open_store():
+        start.wait()
+        try:
+            FeedbackStore(db_path, legacy_path=legacy)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_store) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    store = FeedbackStore(db_path, legacy_path=None)
+    assert log_size(store) == 200
+    assert store.totals(LEGACY_USER_ID) == {'Business': {'score': 200, 'count': 200}}
@@ -0,0 +1,64 @@
+import os
+
+import images
+from edition import Edition
+from images import ARTICLE_IMAGE_WIDTH, IMAGE_URL_PREFIX, LEAD_IMAGE_WIDTH, PLACEHOLDER_IMAGE, image_src, localize_images
+from renderer import render_newspaper
+
+
+class FakeImageCache:
+    # Writes an empty file per (url, width) instead of downloading anything.
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.requests = []
+
+    def thumbnail(self, url, width):
+        self.requests.append((url, width))
+        if 'broken' in url:
+            return None
+        path = os.path.join(self.directory, f"{abs(hash((url, width)))}.jpg")
+        open(path, 'wb').close()
+        return path
+
+
+def make_edition():
+    summaries = [
+        {'title': f"Story {idx}", 'summary': f"Summary {idx}", 'full_text': "Text", 'url': f"https://a.com/{idx}",
+         'image': f"https://img.com/{name}.jpg", 'category': category}
+        for idx, (name, category) in enumerate([('lead', 'Business'), ('second', 'Business'), ('broken', 'Sports')])
+    ]
+    return Edition.from_summaries(['Business', 'Sports'], 'neutral', summaries)
+
+
+def test_lead_gets_its_own_wide_thumbnail(tmp_path, monkeypatch):
+    cache = FakeImageCache(str(tmp_path))
+    monkeypatch.setattr(images, '_image_cache', cache)
+    edition = make_edition()
+    localize_images(edition)
+    assert sorted(cache.requests) == sorted([
+        ("https://img.com/lead.jpg", ARTICLE_IMAGE_WIDTH), ("https://img.com/second.jpg", ARTICLE_IMAGE_WIDTH),
+        ("https://img.com/broken.jpg", ARTICLE_IMAGE_WIDTH), ("https://img.com/lead.jpg", LEAD_IMAGE_WIDTH),
+    ])
+    lead = edition.lead
+    assert lead.thumbnail and edition.lead_thumbnail and lead.thumbnail != edition.lead_thumbnail
+    assert edition.articles[2].thumbnail == ''
+
+
+def test_page_links_to_thumbnails_instead_of_embedding_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, '_image_cache', FakeImageCache(str(tmp_path)))
+    monkeypatch.setattr('renderer.TEMPLATE_FILE', os.path.join(os.path.dirname(__file__), '..', 'template.html'))
+    edition = make_edition()
+    localize_images(edition)
+    page = render_newspaper(['Business', 'Sports'], edition)
+    assert 'data:image/jpeg' not in page
+    assert page.count(IMAGE_URL_PREFIX + os.path.basename(edition.lead_thumbnail)) == 1
+    assert page.count(IMAGE_URL_PREFIX + os.path.basename(edition.lead.thumbnail)) == 1
+
+
+def test_image_src_fallbacks(tmp_path):
+    assert image_src(None, None) is None
+    assert image_src("https://img.com/a.jpg", None) == "https://img.com/a.jpg"
+    assert image_src("https://img.com/a.jpg", '') == PLACEHOLDER_IMAGE
+    # An evicted thumbnail falls back to the original.
+    assert image_src("https://img.com/a.jpg", str(tmp_path / 'gone.jpg')) == "https://img.com/a.jpg"
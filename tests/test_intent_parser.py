@@ -0,0 +1,92 @@
+import pytest
+
+from intent_parser import FAST_PATH_MIN_CONFIDENCE, IntentRecognizer, parse_intent
+
+CATEGORIES = ['Business', 'Technology', 'Sports']
+
+
+@pytest.mark.parametrize('utterance, intent', [
+    ("technology", {'action': 'select_category', 'category': 'Technology'}),
+    ("tell me about sports please", {'action': 'select_category', 'category': 'Sports'}),
+    ("tech", {'action': 'select_category', 'category': 'Technology'}),
+    ("the economy", {'action': 'select_category', 'category': 'Business'}),
+    ("number two", {'action': 'select_headline', 'headline': '2'}),
+    ("headline 3", {'action': 'select_headline', 'headline': '3'}),
+    ("the second one", {'action': 'select_headline', 'headline': '2'}),
+    ("number to", {'action': 'select_headline', 'headline': '2'}),
+    ("yes please", {'action': 'affirm'}),
+    ("nope", {'action': 'deny'}),
+    ("goodbye", {'action': 'exit'}),
+    ("ok bye", {'action': 'exit'}),
+])
+def test_fast_path_intents(utterance, intent):
+    parsed, confidence = parse_intent(utterance, CATEGORIES)
+    assert parsed == intent
+    assert confidence >= FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize('utterance', [
+    "",
+    None,
+    "business or sports",
+    "number two or three",
+    "what is going on with the economy lately",
+    "sports headline two",
+])
+def test_ambiguous_input_goes_to_the_model(utterance):
+    _, confidence = parse_intent(utterance, CATEGORIES)
+    assert confidence < FAST_PATH_MIN_CONFIDENCE
+
+
+def test_unselected_categories_are_not_matched():
+    parsed, _ = parse_intent("entertainment", CATEGORIES)
+    assert parsed == {'action': 'unknown'}
+
+
+class FakeModel:
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def __call__(self, user_input, categories, headlines):
+        self.calls += 1
+        return self.replies.pop(0)
+
+
+def test_recognizer_prefers_the_fast_path():
+    model = FakeModel([])
+    recognizer = IntentRecognizer(model)
+    assert recognizer.recognize("sports", CATEGORIES, []) == (
+        {'action': 'select_category', 'category': 'Sports'}, 'fast_path')
+    assert model.calls == 0
+
+
+def test_recognizer_memoizes_model_answers():
+    answer = {'action': 'select_category', 'category': 'Business'}
+    model = FakeModel([answer])
+    recognizer = IntentRecognizer(model)
+    utterance = "what is going on with the economy lately"
+    assert recognizer.recognize(utterance, CATEGORIES, []) == (answer, 'llm')
+    # Same words, different capitalization and punctuation.
+    assert recognizer.recognize("What is going on with the economy, lately?", CATEGORIES, []) == (answer, 'memoized')
+    assert model.calls == 1
+    assert recognizer.stats()['hit_rate'] == 0.5
+
+
+def test_recognizer_does_not_memoize_failures():
+    answer = {'action': 'select_headline', 'headline': '1'}
+    model = FakeModel([None, answer])
+    recognizer = IntentRecognizer(model)
+    utterance = "what happened with that merger thing"
+    assert recognizer.recognize(utterance, CATEGORIES, ["Merger talks"]) == ({'action': 'unknown'}, 'llm')
+    assert recognizer.recognize(utterance, CATEGORIES, ["Merger talks"]) == (answer, 'llm')
+    assert model.calls == 2
+
+
+def test_recognizer_memo_is_bounded():
+    model = FakeModel([{'action': 'unknown'}] * 3)
+    recognizer = IntentRecognizer(model, memo_size=2)
+    for utterance in ("first vague thing", "second vague thing", "third vague thing"):
+        recognizer.recognize(utterance, CATEGORIES, [])
+    assert len(recognizer.memo) == 2
@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+import news_fetcher
+from news_fetcher import HeadlineCache, fetch_category
+
+KEY = 'business|5|en'
+
+
+class FakeNewsAPI:
+    # Stands in for request_category: replies with the queued results in order.
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.done = threading.Event()
+
+    def __call__(self, category, articles_per_category=5, language='en', etag=None):
+        self.calls.append((category, etag))
+        try:
+            return self.replies.pop(0)
+        finally:
+            self.done.set()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HeadlineCache(str(tmp_path / 'headlines.db'), ttl=300, max_stale=3600)
+    monkeypatch.setattr(news_fetcher, '_headline_cache', cache)
+    return cache
+
+
+def articles(*titles):
+    return [{'title': title, 'category': 'business'} for title in titles]
+
+
+def age_entry(cache, key, seconds):
+    with cache.lock:
+        cache.conn.execute("UPDATE headlines SET fetched = fetched - ? WHERE key = ?", (seconds, key))
+        cache.conn.commit()
+
+
+def test_cache_put_and_get(cache):
+    assert cache.get(KEY) is None
+    cache.put(KEY, articles('a'), etag='"v1"')
+    stored, etag, age = cache.get(KEY)
+    assert stored == articles('a')
+    assert etag == '"v1"'
+    assert 0 <= age < 5
+
+
+def test_unchanged_put_only_refreshes_timestamp(cache):
+    cache.put(KEY, articles('a'), etag='"v1"')
+    age_entry(cache, KEY, 1000)
+    cache.put(KEY, articles('a'), etag='"v2"')
+    stored, etag, age = cache.get(KEY)
+    assert stored == articles('a')
+    assert etag == '"v2"'
+    assert age < 5
+
+
+def test_touch_marks_entry_fresh(cache):
+    cache.put(KEY, articles('a'))
+    age_entry(cache, KEY, 1000)
+    cache.touch(KEY)
+    assert cache.get(KEY)[2] < 5
+
+
+def test_miss_fetches_and_stores(cache, monkeypatch):
+    api = FakeNewsAPI((articles('a'), '"v1"'))
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business') == articles('a')
+    assert cache.get(KEY)[0] == articles('a')
+
+
+def test_miss_with_error_returns_nothing(cache, monkeypatch):
+    monkeypatch.setattr(news_fetcher, 'request_category', FakeNewsAPI((None, None)))
+    assert fetch_category('Business') == []
+    assert cache.get(KEY) is None
+
+
+def test_fresh_entry_is_served_without_a_request(cache, monkeypatch):
+    cache.put(KEY, articles('a'))
+    api = FakeNewsAPI()
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business') == articles('a')
+    assert api.calls == []
+
+
+def test_stale_entry_is_served_while_refreshing_in_background(cache, monkeypatch):
+    cache.put(KEY, articles('a'), etag='"v1"')
+    age_entry(cache, KEY, 600)
+    api = FakeNewsAPI((articles('b'), '"v2"'))
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business') == articles('a')
+    assert api.done.wait(5)
+    for _ in range(100):
+        if not cache.refreshing:
+            break
+        time.sleep(0.01)
+    assert api.calls == [('Business', '"v1"')]
+    assert cache.get(KEY)[0] == articles('b')
+
+
+def test_only_one_background_refresh_per_key(cache, monkeypatch):
+    cache.put(KEY, articles('a'))
+    age_entry(cache, KEY, 600)
+    assert cache.start_refresh(KEY)
+    api = FakeNewsAPI()
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business') == articles('a')
+    assert api.calls == []
+
+
+def test_entry_past_max_stale_is_refetched_first(cache, monkeypatch):
+    cache.put(KEY, articles('a'), etag='"v1"')
+    age_entry(cache, KEY, 7200)
+    api = FakeNewsAPI((articles('b'), '"v2"'))
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business') == articles('b')
+    assert cache.get(KEY)[:2] == (articles('b'), '"v2"')
+
+
+def test_entry_past_max_stale_is_served_when_refetch_fails(cache, monkeypatch):
+    cache.put(KEY, articles('a'))
+    age_entry(cache, KEY, 7200)
+    monkeypatch.setattr(news_fetcher, 'request_category', FakeNewsAPI((None, None)))
+    assert fetch_category('Business') == articles('a')
+
+
+def test_unchanged_reply_keeps_cached_copy(cache, monkeypatch):
+    cache.put(KEY, articles('a'), etag='"v1"')
+    age_entry(cache, KEY, 7200)
+    monkeypatch.setattr(news_fetcher, 'request_category', FakeNewsAPI(('unchanged', '"v1"')))
+    assert fetch_category('Business') == articles('a')
+    assert cache.get(KEY)[2] < 5
+
+
+def test_force_skips_fresh_entry(cache, monkeypatch):
+    cache.put(KEY, articles('a'))
+    api = FakeNewsAPI((articles('b'), None))
+    monkeypatch.setattr(news_fetcher, 'request_category', api)
+    assert fetch_category('Business', force=True) == articles('b')
+    assert len(api.calls) == 1
+
+
+class SlowSession:
+    # A session whose requests take a while, recording how many overlap.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def get(self, url, params, headers, timeout):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return FakeResponse(params['category'])
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, category):
+        self.category = category
+
+    def json(self):
+        return {'articles': [{'title': f"{self.category} story"}]}
+
+
+def test_requests_in_flight_are_capped_per_process(cache, monkeypatch):
+    session = SlowSession()
+    monkeypatch.setattr(news_fetcher, 'get_session', lambda: session)
+    categories = ['Business', 'Technology', 'Sports', 'Science']
+    results = []
+    callers = [
+        threading.Thread(target=lambda: results.append(news_fetcher.fetch_categories(categories)))
+        for _ in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert len(results) == 3
+    assert session.peak <= news_fetcher.MAX_CONCURRENT_REQUESTS
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from playback import NullBackend, PlaybackEngine
+
+
+def test_queued_tracks_play_back_to_back():
+    backend = NullBackend(0.1)
+    engine = PlaybackEngine(backend)
+    paths = ['one.mp3', 'two.mp3', 'three.mp3']
+    tracks = [engine.enqueue(path) for path in paths]
+    assert all(track.wait(5) for track in tracks)
+    assert backend.played == paths
+    # Each track was preloaded behind the one before it, so it starts as that one ends.
+    for previous, track in zip(tracks, tracks[1:]):
+        gap = track.started_at - previous.started_at - backend.duration
+        assert gap < 0.05
+
+
+def test_play_sequence_reports_completion():
+    engine = PlaybackEngine(NullBackend(0.01))
+    assert engine.play_sequence(['a.mp3', 'b.mp3']) is True
+
+
+def test_interrupt_event_stops_its_tracks():
+    backend = NullBackend(5)
+    engine = PlaybackEngine(backend)
+    stop = threading.Event()
+    tracks = [engine.enqueue(path, stop) for path in ['a.mp3', 'b.mp3', 'c.mp3']]
+    time.sleep(0.1)
+    stop.set()
+    assert not any(track.wait(2) for track in tracks)
+    assert all(track.done.is_set() for track in tracks)
+    assert 'c.mp3' not in backend.played
+
+
+def test_interrupt_drops_everything_queued_so_far():
+    backend = NullBackend(5)
+    engine = PlaybackEngine(backend)
+    old = [engine.enqueue(path) for path in ['a.mp3', 'b.mp3']]
+    time.sleep(0.1)
+    engine.interrupt()
+    new = engine.enqueue('reply.mp3')
+    assert not any(track.wait(2) for track in old)
+    assert new.wait(0.5) is False  # still playing
+    assert backend.played[-1] == 'reply.mp3'
+
+
+def test_unloadable_track_is_skipped():
+
+    class FailingBackend(NullBackend):
+        def load(self, path):
+            if path == 'broken.mp3':
+                raise ValueError("bad file")
+            return super().load(path)
+
+    backend = FailingBackend(0.01)
+    engine = PlaybackEngine(backend)
+    tracks = [engine.enqueue(path) for path in ['a.mp3', 'broken.mp3', 'b.mp3']]
+    assert [track.wait(5) for track in tracks] == [True, False, True]
+    assert backend.played == ['a.mp3', 'b.mp3']
@@ -0,0 +1,74 @@
+import os
+from collections import Counter
+
+import pytest
+
+import renderer
+from edition import Edition
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORDER = ['Business', 'Technology']
+
+
+@pytest.fixture
+def render_counts(monkeypatch):
+    # Start every test from empty caches and count cache hits and misses.
+    monkeypatch.setattr(renderer, 'TEMPLATE_FILE', os.path.join(REPO_DIR, 'template.html'))
+    monkeypatch.setattr(renderer, '_template', None)
+    renderer._fragments.clear()
+    renderer._pages.clear()
+    counts = Counter()
+    monkeypatch.setattr(
+        renderer, 'increment', lambda name, kind, result: counts.update([(kind, result)])
+    )
+    return counts
+
+
+def make_edition(tech_summary="Supply improved."):
+    return Edition.from_summaries(ORDER, 'v1', [
+        {'title': 'Markets rally', 'summary': "Stocks rose.", 'url': 'https://example.com/a',
+         'image': None, 'category': 'Business', 'full_text': ''},
+        {'title': 'Chip shortage eases', 'summary': tech_summary, 'url': 'https://example.com/b',
+         'image': None, 'category': 'Technology', 'full_text': ''},
+    ])
+
+
+def test_page_shows_every_section(render_counts):
+    page = renderer.render_newspaper(ORDER, make_edition())
+    for text in ('Markets rally', 'Stocks rose.', 'Chip shortage eases', 'Supply improved.'):
+        assert text in page
+    assert render_counts == {('section', 'miss'): 2, ('page', 'miss'): 1}
+
+
+def test_unchanged_edition_reuses_the_page(render_counts):
+    first = renderer.render_newspaper(ORDER, make_edition())
+    second = renderer.render_newspaper(ORDER, make_edition())
+    assert first == second
+    assert render_counts[('section', 'hit')] == 2
+    assert render_counts[('page', 'hit')] == 1
+
+
+def test_changed_summary_rerenders_only_its_section(render_counts):
+    renderer.render_newspaper(ORDER, make_edition())
+    render_counts.clear()
+    page = renderer.render_newspaper(ORDER, make_edition("Prices are dropping."))
+    assert 'Prices are dropping.' in page
+    assert 'Supply improved.' not in page
+    assert render_counts == {('section', 'hit'): 1, ('section', 'miss'): 1, ('page', 'miss'): 1}
+
+
+def test_reordering_reuses_sections(render_counts):
+    edition = make_edition()
+    renderer.render_newspaper(ORDER, edition)
+    render_counts.clear()
+    page = renderer.render_newspaper(list(reversed(ORDER)), edition)
+    # The lead story is also shown at the top, so compare against its last occurrence.
+    assert page.index('Chip shortage eases') < page.rindex('Markets rally')
+    assert render_counts == {('section', 'hit'): 2, ('page', 'miss'): 1}
+
+
+def test_fragment_cache_is_bounded(render_counts, monkeypatch):
+    monkeypatch.setattr(renderer, 'MAX_CACHED_FRAGMENTS', 2)
+    for idx in range(4):
+        renderer.render_newspaper(ORDER, make_edition(f"Update {idx}."))
+    assert len(renderer._fragments) == 2
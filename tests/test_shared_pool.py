@@ -0,0 +1,153 @@
+import threading
+
+import pytest
+
+from shared_pool import SharedPool, SingleFlight
+from summarizer import summary_record
+
+
+def make_article(idx):
+    return {'title': f"Story {idx}", 'content': f"Body of story {idx}.", 'url': f"https://example.com/{idx}"}
+
+
+class FakeEngine:
+    # Stands in for SummarizationEngine; summarize() blocks until release is set.
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def cache_key(self, article, content, feedback_analysis):
+        return article['url']
+
+    def summarize(self, articles, feedback_analysis):
+        self.calls.append([article['url'] for article in articles])
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [summary_record(article, article['content'], f"Summary of {article['title']}")
+                for article in articles]
+
+
+class WatchedFlights(SingleFlight):
+    # Counts callers that joined a flight another caller leads.
+
+    def __init__(self):
+        super().__init__()
+        self.followers = threading.Semaphore(0)
+
+    def claim(self, key):
+        flight, leader = super().claim(key)
+        if not leader:
+            self.followers.release()
+        return flight, leader
+
+    def wait_for_followers(self, count):
+        return all(self.followers.acquire(timeout=5) for _ in range(count))
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    flights = WatchedFlights()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('key', work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    assert flights.wait_for_followers(4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ['result'] * 5
+    assert flights.flights == {}
+
+
+def test_single_flight_shares_errors_and_allows_retry():
+    flights = SingleFlight()
+    flight, leader = flights.claim('key')
+    assert leader
+    follower, leader = flights.claim('key')
+    assert follower is flight and not leader
+    flights.finish('key', error=ValueError("boom"))
+    with pytest.raises(ValueError):
+        follower.wait()
+    # A finished key starts a new flight.
+    assert flights.do('key', lambda: 'again') == 'again'
+
+
+def test_summarize_shares_work_between_readers():
+    engine = FakeEngine()
+    pool = SharedPool(engine)
+    pool.summaries = WatchedFlights()
+    articles = [make_article(idx) for idx in range(3)]
+    results = {}
+
+    def read(name):
+        results[name] = pool.summarize([dict(article) for article in articles], {})
+
+    first = threading.Thread(target=read, args=('first',))
+    first.start()
+    assert engine.started.wait(5)
+    second = threading.Thread(target=read, args=('second',))
+    second.start()
+    assert pool.summaries.wait_for_followers(3)
+    engine.release.set()
+    first.join(5)
+    second.join(5)
+    assert len(engine.calls) == 1
+    for summaries in results.values():
+        assert [s['summary'] for s in summaries] == [f"Summary of Story {idx}" for idx in range(3)]
+
+
+def test_summarize_failure_releases_waiting_readers():
+    engine = FakeEngine(fail=True)
+    pool = SharedPool(engine)
+    pool.summaries = WatchedFlights()
+    articles = [make_article(1)]
+    errors = []
+    results = []
+
+    def lead():
+        try:
+            pool.summarize(articles, {})
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert engine.started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(pool.summarize(articles, {})))
+    follower.start()
+    assert pool.summaries.wait_for_followers(1)
+    engine.release.set()
+    leader.join(5)
+    follower.join(5)
+    assert not follower.is_alive()
+    assert len(errors) == 1
+    assert results[0][0]['summary'] == "Summary not available."
+    assert pool.summaries.flights == {}
+
+
+def test_summarize_streaming_reports_followed_articles():
+    engine = FakeEngine()
+    engine.release.set()
+    pool = SharedPool(engine)
+    article = make_article(1)
+    flight, leader = pool.summaries.claim(article['url'])
+    updates = []
+    threading.Timer(0.05, pool.summaries.finish, args=(article['url'], "Shared summary")).start()
+    summaries = pool.summarize_streaming([article, {'title': 'Empty', 'url': 'https://example.com/e'}], {},
+                                         lambda idx, text, done: updates.append((idx, text, done)))
+    assert engine.calls == []
+    assert sorted(updates, key=lambda u: u[0]) == [(0, "Shared summary", True), (1, None, True)]
+    assert summaries[0]['summary'] == "Shared summary"
@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+
+import openai
+import pytest
+
+import summarizer
+from summarizer import SummarizationEngine, TokenBucket, pack_batches, parse_batch_items, parse_batch_reply
+
+
+def make_item(idx):
+    article = {'title': f"Story {idx}", 'url': f"https://example.com/{idx}"}
+    return article, f"Body of story {idx}.", f"key-{idx}"
+
+
+class FakeCache:
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, summary):
+        self.entries[key] = summary
+
+
+def test_token_bucket_allows_a_burst_up_to_capacity():
+    bucket = TokenBucket(60, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(600, capacity=1)  # ten tokens a second
+    bucket.acquire()
+    started = time.monotonic()
+    bucket.acquire()
+    assert 0.05 <= time.monotonic() - started < 1
+
+
+def test_token_bucket_caps_requests_larger_than_capacity():
+    bucket = TokenBucket(60, capacity=5)
+    started = time.monotonic()
+    bucket.acquire(50)
+    assert time.monotonic() - started < 0.1
+
+
+def test_token_bucket_is_shared_between_threads():
+    bucket = TokenBucket(1200, capacity=2)  # twenty tokens a second
+    started = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    # Two go through at once; the other four wait for about 0.2s of refill.
+    assert time.monotonic() - started >= 0.15
+
+class FakeCompletion(dict):
+    # openai 0.28 responses are dicts with attribute access.
+    __getattr__ = dict.get
+
+
+def test_complete_retries_rate_limits(monkeypatch):
+    monkeypatch.setattr(summarizer, 'BACKOFF_BASE', 0.001)
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise openai.error.RateLimitError("slow down", http_status=429)
+        return FakeCompletion(choices=[FakeCompletion(message={'content': " Summary. "})], usage={})
+
+    monkeypatch.setattr(openai.ChatCompletion, 'create', create)
+    assert SummarizationEngine().complete("prompt") == "Summary."
+    assert len(attempts) == 3
+
+
+def test_complete_does_not_retry_client_errors(monkeypatch):
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        raise openai.error.InvalidRequestError("bad request", None, http_status=400)
+
+    monkeypatch.setattr(openai.ChatCompletion, 'create', create)
+    with pytest.raises(openai.error.InvalidRequestError):
+        SummarizationEngine().complete("prompt")
+    assert len(attempts) == 1
+
+
+def test_parse_batch_reply_keeps_valid_entries():
+    reply = "Here you go:\n" + json.dumps([
+        {'id': 1, 'summary': " First. "},
+        {'id': '2', 'summary': "Second."},
+        {'id': 3, 'summary': ""},
+        {'id': 9, 'summary': "Out of range."},
+        {'id': 'x', 'summary': "Bad id."},
+        "not an object",
+    ])
+    assert parse_batch_reply(reply, 3) == {1: "First.", 2: "Second."}
+
+
+def test_parse_batch_reply_without_json_array():
+    assert parse_batch_reply("Sorry, I can't help with that.", 2) == {}
+    assert parse_batch_reply("[not json]", 2) == {}
+    assert parse_batch_reply('{"id": 1, "summary": "x"}', 1) == {}
+
+
+def test_summarize_batch_falls_back_for_missing_items():
+    cache = FakeCache()
+    engine = SummarizationEngine(cache=cache)
+    prompts = []
+
+    def complete(prompt, **kwargs):
+        prompts.append(prompt)
+        if kwargs.get('kind') == 'summary_batch':
+            return json.dumps([{'id': 1, 'summary': "Batched one."}, {'id': 3, 'summary': "Batched three."}])
+        return "Single two."
+
+    engine.complete = complete
+    summaries = engine.summarize_batch([make_item(1), make_item(2), make_item(3)], {})
+    assert summaries == ["Batched one.", "Single two.", "Batched three."]
+    assert len(prompts) == 2
+    assert "Story 2" in prompts[1] and "Story 1" not in prompts[1]
+    assert cache.entries == {'key-1': "Batched one.", 'key-2': "Single two.", 'key-3': "Batched three."}
+
+
+def test_summarize_batch_falls_back_when_the_batch_request_fails():
+    engine = SummarizationEngine()
+    calls = []
+
+    def complete(prompt, **kwargs):
+        calls.append(kwargs.get('kind', 'summary'))
+        if kwargs.get('kind') == 'summary_batch':
+            raise RuntimeError("timeout")
+        return "Single."
+
+    engine.complete = complete
+    assert engine.summarize_batch([make_item(1), make_item(2)], {}) == ["Single.", "Single."]
+    assert calls == ['summary_batch', 'summary', 'summary']
+
+def test_pack_batches_respects_budget_and_size():
+    items = [(idx, make_item(idx)) for idx in range(10)]
+    batches = pack_batches(items, token_budget=1000, max_size=3)
+    assert [idx for batch in batches for idx, _ in batch] == list(range(10))
+    # Each article costs about 255 tokens on top of the 100-token prompt overhead.
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [len(batch) for batch in pack_batches(items, token_budget=600)] == [1] * 10
+
+
+def test_summarize_batches_cache_misses():
+    engine = SummarizationEngine(cache=FakeCache())
+    engine.cache.put('https://example.com/0', "Cached.")
+    engine.cache_key = lambda article, content, feedback_analysis: article['url']
+    kinds = []
+
+    def complete(prompt, **kwargs):
+        kinds.append(kwargs.get('kind', 'summary'))
+        count = prompt.count("\nTitle: ")
+        return json.dumps([{'id': idx, 'summary': f"Batched {idx}."} for idx in range(1, count + 1)])
+
+    engine.complete = complete
+    articles = [dict(make_item(idx)[0], content=f"Body {idx}.") for idx in range(4)]
+    records = engine.summarize(articles, {})
+    assert kinds == ['summary_batch']
+    assert [record['summary'] for record in records] == ["Cached.", "Batched 1.", "Batched 2.", "Batched 3."]
+
+def test_streamed_batch_reports_each_summary_as_its_object_completes():
+    engine = SummarizationEngine()
+    reply = json.dumps([{'id': 1, 'summary': "First."}, {'id': 2, 'summary': "Second."}])
+    updates = []
+    seen_at = {}
+
+    def complete_stream(prompt, on_text, **kwargs):
+        assert kwargs['kind'] == 'summary_batch_stream'
+        for end in range(1, len(reply) + 1):
+            on_text(reply[:end])
+            for update in updates:
+                seen_at.setdefault(update, end)
+        return reply
+
+    engine.complete_stream = complete_stream
+    engine.complete = lambda prompt, **kwargs: "Third."
+    summaries = engine.summarize_batch([make_item(1), make_item(2), make_item(3)], {},
+                                       lambda position, text, done: updates.append((position, text, done)))
+    assert summaries == ["First.", "Second.", "Third."]
+    # The first summary arrived before the reply finished streaming.
+    assert seen_at[(0, "First.", True)] < seen_at[(1, "Second.", True)] <= len(reply)
+    # The article the model left out fell back to its own request.
+    assert updates[-1] == (2, "Third.", True)
+
+
+def test_summarize_with_updates_keeps_batching():
+    engine = SummarizationEngine(cache=FakeCache())
+    engine.cache.put('cached', "From cache.")
+    requests = []
+
+    def complete_stream(prompt, on_text, **kwargs):
+        requests.append(kwargs.get('kind', 'summary_stream'))
+        count = prompt.count("\nTitle: ")
+        reply = json.dumps([{'id': idx, 'summary': f"Summary {idx}."} for idx in range(1, count + 1)])
+        on_text(reply)
+        return reply
+
+    engine.complete_stream = complete_stream
+    engine.cache_key = lambda article, content, feedback_analysis: article['url']
+    articles = [{'title': f"Story {idx}", 'content': "Body.", 'url': f"u{idx}"} for idx in range(6)]
+    articles.append({'title': "Cached", 'content': "Body.", 'url': 'cached'})
+    updates = {}
+    records = engine.summarize(articles, {}, lambda idx, text, done: updates.__setitem__(idx, (text, done)))
+    assert requests == ['summary_batch_stream']
+    assert [record['summary'] for record in records] == [f"Summary {idx}." for idx in range(1, 7)] + ["From cache."]
+    assert updates == {idx: (record['summary'], True) for idx, record in enumerate(records)}
+
+
+def test_parse_batch_items_of_an_unfinished_reply():
+    assert parse_batch_items('[{"id": 1, "summary": "Done."}, {"id": 2, "summ', 2) == {1: "Done."}
+    assert parse_batch_items('Sure! [', 2) == {}
+    assert parse_batch_items('[{"id": 1, "summary": "A."}, {"id": 2, "summary": "B."}]', 2) == {1: "A.", 2: "B."}
@@ -0,0 +1,67 @@
+import pytest
+
+from summary_cache import SummaryCache, summary_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SummaryCache(str(tmp_path / 'summaries.db'), ttl=1000, max_entries=2, last_used_interval=60)
+
+
+def last_used(cache, key):
+    return cache.conn.execute("SELECT last_used FROM summaries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def age_entry(cache, key, created=0, used=0):
+    cache.conn.execute(
+        "UPDATE summaries SET created = created - ?, last_used = last_used - ? WHERE key = ?",
+        (created, used, key)
+    )
+    cache.conn.commit()
+
+
+def test_key_changes_with_every_input():
+    base = summary_cache_key('u', 'c', 'm', 'v')
+    assert base == summary_cache_key('u', 'c', 'm', 'v')
+    assert len({base, summary_cache_key('u2', 'c', 'm', 'v'), summary_cache_key('u', 'c2', 'm', 'v'),
+                summary_cache_key('u', 'c', 'm2', 'v'), summary_cache_key('u', 'c', 'm', 'v2')}) == 5
+
+
+def test_put_and_get(cache):
+    assert cache.get('a') is None
+    cache.put('a', "Summary A")
+    assert cache.get('a') == "Summary A"
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.put('a', "Summary A")
+    age_entry(cache, 'a', created=2000)
+    assert cache.get('a') is None
+
+
+def test_recent_hit_does_not_rewrite_last_used(cache):
+    cache.put('a', "Summary A")
+    age_entry(cache, 'a', used=30)
+    before = last_used(cache, 'a')
+    assert cache.get('a') == "Summary A"
+    assert last_used(cache, 'a') == before
+
+
+def test_hit_after_interval_refreshes_last_used(cache):
+    cache.put('a', "Summary A")
+    age_entry(cache, 'a', used=120)
+    before = last_used(cache, 'a')
+    assert cache.get('a') == "Summary A"
+    assert last_used(cache, 'a') > before + 100
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put('a', "Summary A")
+    cache.put('b', "Summary B")
+    age_entry(cache, 'a', used=300)
+    age_entry(cache, 'b', used=200)
+    cache.get('a')
+    cache.put('c', "Summary C")
+    assert cache.get('b') is None
+    assert cache.get('a') == "Summary A"
+    assert cache.get('c') == "Summary C"
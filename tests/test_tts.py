@@ -0,0 +1,116 @@
+import os
+import threading
+
+import pytest
+
+import tts
+from tts import AudioCache, precompute_prompts, split_into_chunks, stream_speech
+
+TEXT = " ".join(f"Sentence number {idx} of the story." for idx in range(30))
+
+
+class FakeTrack:
+
+    def __init__(self, path, interrupt_event):
+        self.path = path
+        self.interrupt_event = interrupt_event
+        self.finished = threading.Event()
+
+    def wait(self, timeout=None):
+        # Plays until the test finishes it or the reader interrupts.
+        while not self.finished.wait(0.01):
+            if self.interrupt_event.is_set():
+                return False
+        return True
+
+
+def fake_synthesizer(calls):
+    def synthesize(text, lang, path):
+        calls.append(text)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return synthesize
+
+
+@pytest.fixture
+def audio_cache(monkeypatch, tmp_path):
+    # The process-wide audio cache, synthesizing text files instead of calling gTTS.
+    synthesized = []
+    cache = AudioCache(str(tmp_path / 'tts'), synthesizer=fake_synthesizer(synthesized))
+    cache.synthesized = synthesized
+    monkeypatch.setattr(tts, '_audio_cache', cache)
+    return cache
+
+
+def test_audio_cache_reuses_and_evicts(tmp_path):
+    calls = []
+
+    def synthesize(text, lang, path):
+        calls.append(text)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+
+    cache = AudioCache(str(tmp_path / 'tts'), max_bytes=250, synthesizer=synthesize)
+    first = cache.synthesize("first")
+    assert cache.synthesize("first") == first
+    second = cache.synthesize("second")
+    os.utime(first, (1000, 1000))
+    os.utime(second, (500, 500))
+    # A hit marks the file as recently used, so "second" is the one evicted.
+    cache.synthesize("first")
+    cache.synthesize("third")
+    assert calls == ["first", "second", "third"]
+    assert sorted(os.listdir(cache.directory)) == sorted(
+        os.path.basename(cache.path_for(text)) for text in ("first", "third")
+    )
+
+
+def test_precompute_prompts_synthesizes_each_prompt_once(audio_cache):
+    precompute_prompts()
+    precompute_prompts()
+    assert audio_cache.synthesized == tts.CANNED_PROMPTS
+    assert all(os.path.exists(audio_cache.path_for(text)) for text in tts.CANNED_PROMPTS)
+
+
+def test_stream_speech_plays_every_chunk_in_order(audio_cache):
+    played = []
+
+    def enqueue(path, interrupt_event):
+        track = FakeTrack(path, interrupt_event)
+        track.finished.set()
+        played.append(path)
+        return track
+
+    stream_speech(TEXT, enqueue, threading.Event(), max_chars=100)
+    chunks = split_into_chunks(TEXT, 100)
+    assert len(chunks) > 3
+    assert audio_cache.synthesized == chunks
+    assert played == [audio_cache.path_for(chunk) for chunk in chunks]
+
+
+def test_stream_speech_interrupt_stops_playback_and_synthesis(audio_cache):
+    interrupt = threading.Event()
+    tracks = []
+
+    def enqueue(path, interrupt_event):
+        track = FakeTrack(path, interrupt_event)
+        tracks.append(track)
+        if len(tracks) == 2:
+            interrupt.set()
+        return track
+
+    speaker = threading.Thread(target=stream_speech, args=(TEXT, enqueue, interrupt), kwargs={'max_chars': 100})
+    speaker.start()
+    speaker.join(5)
+    assert not speaker.is_alive()
+    assert len(tracks) == 2
+    # The producer stays at most lookahead chunks ahead of playback.
+    assert len(audio_cache.synthesized) <= len(tracks) + tts.TTS_LOOKAHEAD + 1
+    assert len(audio_cache.synthesized) < len(split_into_chunks(TEXT, 100))
+
+
+def test_split_into_chunks_keeps_sentences_whole():
+    chunks = split_into_chunks(TEXT, 100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert ' '.join(chunks) == TEXT
@@ -0,0 +1,45 @@
+import os
+
+from bench import write_utterance
+from voice_input import VoiceInputSession, WavFileInput, create_voice_session
+
+
+def utterance(directory, name, transcript=None):
+    # A WAV file of one spoken phrase, with its transcript next to it unless transcript is None.
+    path = str(directory / f"{name}.wav")
+    write_utterance(path, transcript or '')
+    if transcript is None:
+        os.remove(str(directory / f"{name}.txt"))
+    return path
+
+
+def test_wav_input_hears_each_file_in_turn(tmp_path):
+    paths = [utterance(tmp_path, 'first', "technology"), utterance(tmp_path, 'second', "number two")]
+    audio_input = WavFileInput(paths)
+    session = VoiceInputSession(audio_input, audio_input.recognize)
+    assert session.listen() == "technology"
+    assert audio_input.last_path == paths[0]
+    assert session.listen() == "number two"
+    # Out of files: nothing was heard.
+    assert session.listen() is None
+
+
+def test_wav_input_without_transcript_is_unintelligible(tmp_path):
+    audio_input = WavFileInput([utterance(tmp_path, 'mumble')])
+    session = VoiceInputSession(audio_input, audio_input.recognize)
+    assert session.listen() is None
+
+
+def test_wav_input_endpoints_the_phrase(tmp_path):
+    audio_input = WavFileInput([utterance(tmp_path, 'short', "sports")])
+    session = VoiceInputSession(audio_input, lambda recognizer, audio: audio)
+    audio = session.listen()
+    # The recording stops after the pause that follows the phrase, not at the end of the file.
+    seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+    assert 0.5 < seconds < 2.2
+
+
+def test_create_voice_session_replays_wav_files(tmp_path):
+    session = create_voice_session([utterance(tmp_path, 'turn', "business")], backend='transcript')
+    assert session.listen() == "business"
+    session.close()
@@ -0,0 +1,212 @@
+import collections
+import hashlib
+import os
+import queue
+import re
+import threading
+from datetime import datetime
+
+from gtts import gTTS
+
+from disk_cache import DiskLRU
+from metrics import increment, span
+
+# Where synthesized speech is kept and how much disk it may use.
+TTS_CACHE_DIR = os.path.join('cache', 'tts')
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_LANG = 'en'
+TTS_CHUNK_SIZE = 500
+# How many synthesized chunks may wait ahead of the one currently playing.
+TTS_LOOKAHEAD = 2
+
+# Fixed phrases the assistant says; these are synthesized ahead of time.
+NO_INPUT_PROMPT = "I didn't hear anything. Could you please repeat?"
+FAREWELL_PROMPT = "Goodbye! Feel free to call me anytime."
+UNKNOWN_CATEGORY_PROMPT = "I'm sorry, I didn't catch that category. Please choose from your selected categories."
+CHOOSE_CATEGORY_PROMPT = "Please tell me which category you'd like to hear about."
+INVALID_HEADLINE_PROMPT = "I'm sorry, that headline number is not valid. Please choose a valid headline number."
+WHICH_HEADLINE_PROMPT = "Which headline number are you interested in?"
+MENTION_HEADLINE_PROMPT = "Please mention the headline number you're interested in."
+ACKNOWLEDGMENT_PROMPT = "Alright, let me know if you need anything else."
+CANNED_PROMPTS = [
+    NO_INPUT_PROMPT,
+    FAREWELL_PROMPT,
+    UNKNOWN_CATEGORY_PROMPT,
+    CHOOSE_CATEGORY_PROMPT,
+    INVALID_HEADLINE_PROMPT,
+    WHICH_HEADLINE_PROMPT,
+    MENTION_HEADLINE_PROMPT,
+    ACKNOWLEDGMENT_PROMPT,
+]
+
+
+def greeting_text(name, categories):
+    # Greet the user and invite them to choose a category to start with.
+    return (
+        f"Good morning {name}, I'm your AI News Reporter Emily. "
+        f"Today is {datetime.now().strftime('%A, %B %d')}, and your personalized newspaper has been generated. "
+        f"Your preferred news categories are {', '.join(categories)}. "
+        "Let me know which category should I start reporting with first."
+    )
+
+
+def headlines_announcement(category, headlines):
+    return f"Here are the top headlines in {category}: " + " ".join(
+        [f"{idx +1}: {headline}." for idx, headline in enumerate(headlines)]
+    )
+
+
+def summary_announcement(number, summary):
+    return f"Here is a summary of headline {number}: {summary}. Would you like the full article?"
+
+
+def gtts_synthesizer(text, lang, path):
+    gTTS(text=text, lang=lang, slow=False).save(path)
+
+
+class AudioCache(DiskLRU):
+    # Content-hashed mp3 files on disk, trimmed in least-recently-used order.
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, lang=TTS_LANG,
+                 synthesizer=None):
+        super().__init__(directory, max_bytes)
+        self.lang = lang
+        # synthesizer(text, lang, path) writes the speech for text to path.
+        self.synthesizer = synthesizer or gtts_synthesizer
+
+    def path_for(self, text):
+        digest = hashlib.sha256(f"{self.lang}\0{text}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.mp3")
+
+    def synthesize(self, text):
+        # Return an mp3 for the text, calling gTTS only if it is not cached yet.
+        path = self.path_for(text)
+        if self.lookup(path):
+            increment('tts_cache', result='hit')
+            return path
+        increment('tts_cache', result='miss')
+        with span('tts_synthesize') as details:
+            self.store(path, lambda tmp_path: self.synthesizer(text, self.lang, tmp_path))
+            details['chars'] = len(text)
+        return path
+
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    # One audio cache per process, shared across turns and sessions.
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+    return _audio_cache
+
+
+def split_into_chunks(text, max_chars=TTS_CHUNK_SIZE):
+    # Split text into chunks of whole sentences, falling back to whole words
+    # for sentences longer than max_chars.
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+    chunks = []
+    current = ''
+    for sentence in sentences:
+        if not sentence:
+            continue
+        pieces = [sentence]
+        if len(sentence) > max_chars:
+            pieces = []
+            piece = ''
+            for word in sentence.split():
+                if piece and len(piece) + 1 + len(word) > max_chars:
+                    pieces.append(piece)
+                    piece = word
+                else:
+                    piece = f"{piece} {word}" if piece else word
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def stream_speech(text, enqueue, interrupt_event, lookahead=TTS_LOOKAHEAD, max_chars=TTS_CHUNK_SIZE):
+    # Speak text chunk by chunk: a producer thread synthesizes ahead while
+    # enqueue(path, interrupt_event) hands each chunk to the player and returns
+    # a track whose wait() blocks until it has played. One chunk is kept queued
+    # behind the one playing so they run together. Setting interrupt_event
+    # stops both the playback and the synthesis.
+    cache = get_audio_cache()
+    ready = queue.Queue(maxsize=max(1, lookahead))
+    done = object()
+    stop = threading.Event()
+
+    def stopped():
+        return stop.is_set() or interrupt_event.is_set()
+
+    def offer(item):
+        # Wait for room in the queue without missing a stop request.
+        while not stopped():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in split_into_chunks(text, max_chars):
+                if stopped():
+                    return
+                try:
+                    path = cache.synthesize(chunk)
+                except Exception as e:
+                    print(f"Error synthesizing speech: {e}")
+                    return
+                if not offer(path):
+                    return
+        finally:
+            offer(done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    playing = collections.deque()
+    try:
+        while not interrupt_event.is_set():
+            try:
+                path = ready.get(timeout=0.1)
+            except queue.Empty:
+                if not producer.is_alive() and ready.empty():
+                    break
+                continue
+            if path is done:
+                break
+            playing.append(enqueue(path, interrupt_event))
+            while len(playing) > 1:
+                playing.popleft().wait()
+    finally:
+        stop.set()
+        for track in playing:
+            track.wait()
+
+
+def precompute_prompts(texts=CANNED_PROMPTS):
+    # Synthesize the fixed assistant phrases so they play instantly later on.
+    cache = get_audio_cache()
+    for text in texts:
+        try:
+            cache.synthesize(text)
+        except Exception as e:
+            print(f"Error precomputing prompt audio: {e}")
+
+
+if __name__ == "__main__":
+    # Run at install time to warm the cache: python tts.py
+    precompute_prompts()
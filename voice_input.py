@@ -0,0 +1,162 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+import speech_recognition as sr
+
+from metrics import span
+
+# Voice input keeps one audio session open across turns: the microphone is
+# calibrated once, the energy threshold keeps tracking the room while we wait
+# for speech, and recognition starts as soon as the reader pauses.
+CALIBRATION_SECONDS = 0.5
+LISTEN_TIMEOUT = 5
+# Silence that ends a phrase, and the longest phrase we will record.
+PAUSE_THRESHOLD = 0.5
+NON_SPEAKING_DURATION = 0.3
+PHRASE_TIME_LIMIT = 10
+
+
+def google_backend(recognizer, audio):
+    return recognizer.recognize_google(audio)
+
+
+def sphinx_backend(recognizer, audio):
+    # Offline recognition; needs the pocketsphinx package.
+    return recognizer.recognize_sphinx(audio)
+
+
+RECOGNIZER_BACKENDS = {
+    'google': google_backend,
+    'sphinx': sphinx_backend,
+}
+
+
+class MicrophoneInput:
+    # A microphone stream that stays open between turns.
+
+    def __init__(self, device_index=None, calibration_seconds=CALIBRATION_SECONDS):
+        self.microphone = sr.Microphone(device_index=device_index)
+        self.calibration_seconds = calibration_seconds
+        self.source = None
+
+    def capture(self, recognizer, timeout, phrase_time_limit):
+        if self.source is None:
+            self.source = self.microphone.__enter__()
+            recognizer.adjust_for_ambient_noise(self.source, duration=self.calibration_seconds)
+        else:
+            self._discard_buffered()
+        try:
+            return recognizer.listen(self.source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+        except OSError:
+            # The device went away; reopen and recalibrate on the next turn.
+            self.close()
+            raise
+
+    def _discard_buffered(self):
+        # Drop audio captured while we were not listening (e.g. the anchor speaking).
+        try:
+            stream = self.source.stream.pyaudio_stream
+            available = stream.get_read_available()
+            if available:
+                self.source.stream.read(available)
+        except (AttributeError, OSError):
+            pass
+
+    def close(self):
+        if self.source is not None:
+            try:
+                self.microphone.__exit__(None, None, None)
+            except Exception:
+                pass
+            self.source = None
+
+
+class WavFileInput:
+    # Offline stand-in for the microphone: each turn "hears" the next WAV file.
+    # The transcript of a file is read from a .txt file next to it, so the loop
+    # can be exercised without a microphone or network.
+
+    def __init__(self, paths):
+        self.paths = collections.deque(paths)
+        self.last_path = None
+
+    def capture(self, recognizer, timeout, phrase_time_limit):
+        if not self.paths:
+            return None
+        path = self.paths.popleft()
+        self.last_path = path
+        with sr.AudioFile(path) as source:
+            return recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+
+    def recognize(self, recognizer, audio):
+        transcript_path = os.path.splitext(self.last_path)[0] + '.txt'
+        try:
+            with open(transcript_path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            raise sr.UnknownValueError()
+
+    def close(self):
+        pass
+
+
+class VoiceInputSession:
+    # Listens for one utterance per call and turns it into text with the chosen backend.
+
+    def __init__(self, audio_input, backend=google_backend, pause_threshold=PAUSE_THRESHOLD,
+                 phrase_time_limit=PHRASE_TIME_LIMIT):
+        self.recognizer = sr.Recognizer()
+        self.recognizer.dynamic_energy_threshold = True
+        self.recognizer.pause_threshold = pause_threshold
+        self.recognizer.non_speaking_duration = min(NON_SPEAKING_DURATION, pause_threshold)
+        self.audio_input = audio_input
+        self.backend = backend
+        self.phrase_time_limit = phrase_time_limit
+        self.lock = threading.Lock()
+
+    def listen(self, timeout=LISTEN_TIMEOUT):
+        # Returns the recognized text, or None if nothing intelligible was said in time.
+        with self.lock:
+            with span('voice_listen') as details:
+                try:
+                    audio = self.audio_input.capture(self.recognizer, timeout, self.phrase_time_limit)
+                except sr.WaitTimeoutError:
+                    audio = None
+                details['heard'] = audio is not None
+                details['energy_threshold'] = round(self.recognizer.energy_threshold)
+            if audio is None:
+                return None
+            with span('speech_recognition') as details:
+                try:
+                    text = self.backend(self.recognizer, audio)
+                except sr.UnknownValueError:
+                    text = None
+                details['recognized'] = text is not None
+            return text
+
+    def close(self):
+        with self.lock:
+            self.audio_input.close()
+
+
+def create_voice_session(wav_files=None, backend='google', device_index=None):
+    # A microphone session, or the offline WAV stand-in when wav_files is given.
+    if wav_files:
+        audio_input = WavFileInput(wav_files)
+        recognize = audio_input.recognize if backend == 'transcript' else RECOGNIZER_BACKENDS[backend]
+    else:
+        audio_input = MicrophoneInput(device_index)
+        recognize = RECOGNIZER_BACKENDS[backend]
+    return VoiceInputSession(audio_input, recognize)
+
+
+if __name__ == "__main__":
+    # Replay WAV files through the endpointing and recognition path:
+    #   python voice_input.py turn1.wav turn2.wav
+    session = create_voice_session(sys.argv[1:], backend='transcript')
+    for _ in sys.argv[1:]:
+        started = time.time()
+        print(repr(session.listen()), f"{time.time() - started:.2f}s")